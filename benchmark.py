@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+"""Bomberman benchmarks
+
+Usage:
+    python benchmark.py tick [--sizes 10 64 256] [--walls 0.1 0.3] [--bombs 0 20] [--bots 0 8]
+                             [--ticks 100] [--save bench_results/<label>.json] [--compare <results.json>]
+    python benchmark.py path [--sizes 10 50 100 250] [--bots 1 10 50] [--max-iter 10 1000]
+    python benchmark.py blast [--sizes 10 64 256 1000] [--bombs 1 20 200] [--seeds 20]
+    python benchmark.py map [--sizes 100 1000 4000] [--maps classic cave rooms] [--players 4]
+
+tick drives the GameBoard.tick phases directly (no sleep, no socket) and
+reports the median and p99 time of each phase, in ms.
+
+blast times the NumPy board arrays against the object model on random
+boards, with the check of tests/test_board_arrays.py on larger boards
+(exit status 1 on a difference).
+
+map times a fresh room of each generated map type: board creation, then
+spawning the first players (their chunks are generated on the way).
+"""
+
+import argparse
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from uuid import uuid1
+
+from bomb import Bomb
+from constants import MapTypes
+from game_board import GameBoard
+from user import User
+
+SEED = 42
+WALL_DENSITY = 0.2
+# Users spawned per cell by the blast check
+USER_DENSITY = 0.02
+RESULTS_DIR = "bench_results"
+PHASES = ["board_update", "entities_update", "create_message", "clean_entities", "tick"]
+
+
+def make_board(size, wall_density=WALL_DENSITY, seed=SEED, arrays=False):
+    """Square board with randomly spawned walls"""
+    return GameBoard(size, size, int(size * size * wall_density), seed=seed, arrays=arrays)
+
+
+def bench_path(sizes, bots, max_iters, repeat):
+    """Time one bot step (a find_path per bot toward a shared target)"""
+    print(f"{'size':>6} {'bots':>6} {'max_iter':>9} {'step ms':>10} {'search us':>10}")
+    for size in sizes:
+        board = make_board(size)
+        for nb_bots in bots:
+            origins = board.random_spawn(nb_bots)
+            target = board.random_spawn()[0]
+            for max_iter in max_iters:
+                times = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    for origin in origins:
+                        board.find_path(origin, target, max_iter)
+                    times.append(time.perf_counter() - start)
+                step = statistics.median(times)
+                print(f"{size:>6} {nb_bots:>6} {max_iter:>9} {step * 1e3:>10.3f} {step / nb_bots * 1e6:>10.1f}")
+
+
+def check_blasts(board, nb_bombs):
+    """Compare the object model and the board arrays on random users and bombs
+
+    Returns:
+        (bool, float, float): same results, object model and arrays blast seconds
+    """
+    for position in board.random_spawn(max(1, int(board.length * board.width * USER_DENSITY))):
+        board.spawn(User(None, position, board.mailbox, 0, str(uuid1())), board.users)
+    # Bombs under some users, the others on free cells
+    positions = [user.get_position() for user in list(board.users)[:nb_bombs // 4]]
+    positions += [p for p in board.random_spawn(nb_bombs - len(positions)) if board.grid.is_free(p)]
+    bombs = [Bomb(position, board.mailbox, None) for position in set(positions)]
+    for bomb in bombs:
+        board.spawn(bomb, board.bombs)
+
+    start = time.perf_counter()
+    objects = [board.get_blast(bomb) for bomb in bombs]
+    objects_time = time.perf_counter() - start
+    start = time.perf_counter()
+    arrays = board.get_blasts(bombs)
+    arrays_time = time.perf_counter() - start
+    same = objects == arrays
+
+    board.detonate(bombs)
+    # Some users walk into the explosions
+    for user, explosion in zip(board.users, board.explosions):
+        user.set_position(explosion.get_position())
+    board_arrays, board.arrays = board.arrays, None
+    objects_hits = board.get_users_in_explosions()
+    board.arrays = board_arrays
+    same = same and set(objects_hits) == set(board.get_users_in_explosions())
+    return same, objects_time, arrays_time
+
+
+def bench_blast(sizes, bombs, seeds):
+    """Differential check and timings of the vectorized blasts
+
+    Returns:
+        bool: no difference found
+    """
+    print(f"{'size':>6} {'bombs':>6} {'seeds':>6} {'objects ms':>11} {'arrays ms':>10}")
+    same = True
+    for size, nb_bombs in itertools.product(sizes, bombs):
+        results = [check_blasts(make_board(size, seed=seed, arrays=True), nb_bombs) for seed in range(seeds)]
+        failed = [seed for seed, result in enumerate(results) if not result[0]]
+        if failed:
+            same = False
+            print(f"size={size} bombs={nb_bombs}: arrays differ from the object model for seeds {failed}")
+        objects = statistics.median(result[1] for result in results) * 1e3
+        arrays = statistics.median(result[2] for result in results) * 1e3
+        print(f"{size:>6} {nb_bombs:>6} {seeds:>6} {objects:>11.3f} {arrays:>10.3f}")
+    return same
+
+
+def add_bombs(board, owner, nb):
+    """Keep nb bombs in flight"""
+    for position in board.random_spawn(nb - len(board.bombs)) if len(board.bombs) < nb else []:
+        if board.grid.is_free(position):
+            board.spawn(Bomb(position, board.mailbox, owner), board.bombs)
+
+
+def run_ticks(board, ticks, bombs):
+    """Run ticks phase by phase, same order as GameBoard.tick
+
+    Returns:
+        dict: {phase: [seconds]}
+    """
+    # Bombs owner, not on the board
+    owner = User(None, board.random_spawn()[0], board.mailbox, 0, str(uuid1()))
+    times = {phase: [] for phase in PHASES}
+    for _ in range(ticks):
+        add_bombs(board, owner, bombs)
+        start = time.perf_counter()
+        board.board_update()
+        board_done = time.perf_counter()
+        board.entities_update()
+        entities_done = time.perf_counter()
+        board.create_message()
+        message_done = time.perf_counter()
+        board.clean_entities()
+        board.send_logs()
+        end = time.perf_counter()
+        times["board_update"].append(board_done - start)
+        times["entities_update"].append(entities_done - board_done)
+        times["create_message"].append(message_done - entities_done)
+        times["clean_entities"].append(end - message_done)
+        times["tick"].append(end - start)
+    return times
+
+
+def summarize(times):
+    """{phase: [seconds]} -> {phase: {"median": ms, "p99": ms}}"""
+    return {
+        phase: {
+            "median": statistics.median(values) * 1e3,
+            "p99": statistics.quantiles(values, n=100)[98] * 1e3 if len(values) > 1 else values[0] * 1e3,
+        }
+        for phase, values in times.items()
+    }
+
+
+def bench_tick(sizes, wall_densities, bombs, bots, ticks, warmup):
+    """Tick phases timings for every configuration
+
+    Returns:
+        dict: {configuration key: {phase: {"median": ms, "p99": ms}}}
+    """
+    results = {}
+    for size, density, nb_bombs, nb_bots in itertools.product(sizes, wall_densities, bombs, bots):
+        board = make_board(size, density)
+        for _ in range(nb_bots):
+            board.add_bot()
+        run_ticks(board, warmup, nb_bombs)
+        key = f"size={size} walls={density} bombs={nb_bombs} bots={nb_bots}"
+        results[key] = summarize(run_ticks(board, ticks, nb_bombs))
+    return results
+
+
+def bench_map(sizes, map_types, players):
+    """Time fresh generated rooms"""
+    print(f"{'size':>6} {'map':>8} {'create ms':>10} {'spawn ms':>10} {'walls':>8} {'chunks':>13}")
+    for size, map_type in itertools.product(sizes, map_types):
+        start = time.perf_counter()
+        board = GameBoard(size, size, 0, seed=SEED, map_type=map_type)
+        created = time.perf_counter()
+        for _ in range(players):
+            board.add_bot()
+        # First bot actions, flow fields load the chunks around the targets
+        board.tick()
+        spawned = time.perf_counter()
+        nb_chunks = board.positions.nb_chunks
+        chunks = f"{nb_chunks - board.grid.nb_unloaded}/{nb_chunks}"
+        print(f"{size:>6} {map_type:>8} {(created - start) * 1e3:>10.1f} {(spawned - created) * 1e3:>10.1f} "
+              f"{len(board.walls):>8} {chunks:>13}")
+
+
+def get_label():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return time.strftime("%Y%m%d-%H%M%S")
+
+
+def print_results(results, reference=None):
+    """Print medians/p99 by phase, with the ratio to a reference run if any"""
+    header = "".join(f"{phase:>24}" for phase in PHASES)
+    print(f"{'configuration (median / p99 ms)':<42}{header}")
+    for key, phases in results.items():
+        cells = []
+        for phase in PHASES:
+            cell = f"{phases[phase]['median']:.3f} / {phases[phase]['p99']:.3f}"
+            if reference and key in reference:
+                cell += f" x{phases[phase]['median'] / max(reference[key][phase]['median'], 1e-9):.2f}"
+            cells.append(f"{cell:>24}")
+        print(f"{key:<42}{''.join(cells)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    tick = commands.add_parser("tick", help="tick phases")
+    tick.add_argument("--sizes", type=int, nargs="+", default=[10, 64, 256])
+    tick.add_argument("--walls", type=float, nargs="+", default=[0.1, 0.3], help="wall density")
+    tick.add_argument("--bombs", type=int, nargs="+", default=[0, 20], help="bombs in flight")
+    tick.add_argument("--bots", type=int, nargs="+", default=[0, 8])
+    tick.add_argument("--ticks", type=int, default=100)
+    tick.add_argument("--warmup", type=int, default=10)
+    tick.add_argument("--save", help=f"results file, default {RESULTS_DIR}/<git commit>.json")
+    tick.add_argument("--compare", help="results file to compare medians with")
+
+    path = commands.add_parser("path", help="bot pathfinding")
+    path.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100, 250])
+    path.add_argument("--bots", type=int, nargs="+", default=[1, 10, 50])
+    path.add_argument("--max-iter", type=int, nargs="+", default=[10, 1000])
+    path.add_argument("--repeat", type=int, default=5)
+
+    blast = commands.add_parser("blast", help="vectorized blasts check (needs NumPy)")
+    blast.add_argument("--sizes", type=int, nargs="+", default=[10, 64, 256, 1000])
+    blast.add_argument("--bombs", type=int, nargs="+", default=[1, 20, 200])
+    blast.add_argument("--seeds", type=int, default=20)
+
+    generated = commands.add_parser("map", help="generated rooms creation")
+    generated.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 4000])
+    generated.add_argument("--maps", nargs="+", choices=MapTypes.ALL[1:], default=MapTypes.ALL[1:])
+    generated.add_argument("--players", type=int, default=4)
+
+    args = parser.parse_args()
+    if args.command == "blast":
+        if not bench_blast(args.sizes, args.bombs, args.seeds):
+            sys.exit(1)
+    elif args.command == "map":
+        bench_map(args.sizes, args.maps, args.players)
+    elif args.command == "path":
+        bench_path(args.sizes, args.bots, args.max_iter, args.repeat)
+    elif args.command == "tick":
+        results = bench_tick(args.sizes, args.walls, args.bombs, args.bots, args.ticks, args.warmup)
+        reference = None
+        if args.compare:
+            with open(args.compare) as f:
+                reference = json.load(f)["results"]
+        print_results(results, reference)
+
+        save = args.save or os.path.join(RESULTS_DIR, f"{get_label()}.json")
+        os.makedirs(os.path.dirname(save) or ".", exist_ok=True)
+        with open(save, "w") as f:
+            json.dump({"label": get_label(), "ticks": args.ticks, "results": results}, f, indent=2)
+        print(f"Saved {save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class BoardArrays:
+    """Struct of arrays view of the board occupancy (optional, needs NumPy)
+
+    Count grids indexed [x, y], kept up to date by the OccupancyGrid: the
+    destructible entities stopping the blast rays and the explosions. Lets
+    the blasts of every bomb detonating in a tick and the users standing in
+    explosions be found with array operations.
+    """
+
+    def __init__(self, length, width):
+        self.length = length
+        self.width = width
+        self.explosions = np.zeros((length, width), dtype=np.int16)
+        # DESTRUCTIBLE entities (walls, users and bots), blast ray stops
+        self.destructible = np.zeros((length, width), dtype=np.int16)
+        self._x = np.arange(length)
+        self._y = np.arange(width)
+
+    @staticmethod
+    def is_available():
+        return np is not None
+
+    def add(self, entity, position):
+        if entity.EXPLODING:
+            self.explosions[position.x, position.y] += 1
+        if entity.DESTRUCTIBLE:
+            self.destructible[position.x, position.y] += 1
+
+    def remove(self, entity, position):
+        if entity.EXPLODING:
+            self.explosions[position.x, position.y] -= 1
+        if entity.DESTRUCTIBLE:
+            self.destructible[position.x, position.y] -= 1
+
+    @staticmethod
+    def _get_coordinates(positions):
+        xs = np.fromiter((position.x for position in positions), dtype=np.intp, count=len(positions))
+        ys = np.fromiter((position.y for position in positions), dtype=np.intp, count=len(positions))
+        return xs, ys
+
+    def get_ray_ends(self, positions):
+        """Blast rays of bombs, stopped by destructible entities
+
+        Args:
+            positions ([Position]): bombs positions
+
+        Returns:
+            ([bool], [int], [int], [int], [int]): center, up, down, left,
+                right of each bomb. center is True when a
+                destructible entity stands on the bomb, the others are the
+                coordinate of the first destructible cell of each ray, -1
+                (up, left) or length/width (down, right) when the ray
+                reaches the board edge
+        """
+        xs, ys = self._get_coordinates(positions)
+        center = self.destructible[xs, ys] > 0
+
+        # Rays along y, rows of the bombs
+        rows = self.destructible[xs] > 0
+        left = np.where(rows & (self._y < ys[:, None]), self._y, -1).max(axis=1)
+        right = np.where(rows & (self._y > ys[:, None]), self._y, self.width).min(axis=1)
+
+        # Rays along x, columns of the bombs
+        columns = self.destructible[:, ys].T > 0
+        up = np.where(columns & (self._x < xs[:, None]), self._x, -1).max(axis=1)
+        down = np.where(columns & (self._x > xs[:, None]), self._x, self.length).min(axis=1)
+        return center.tolist(), up.tolist(), down.tolist(), left.tolist(), right.tolist()
+
+    def get_in_explosions(self, positions):
+        """Check which positions hold an explosion
+
+        Returns:
+            [bool]: for each position
+        """
+        xs, ys = self._get_coordinates(positions)
+        return (self.explosions[xs, ys] > 0).tolist()
@@ -7,23 +7,30 @@ class Bomb(Entity):
     STATE_INTERVAL = 1
     BLOCKABLE = True
 
-    def __init__(self, position, mailbox, user):
+    __slots__ = ("user", "exploded", "seq")
+
+    def __init__(self, position, mailbox, user, seq=0):
+        """
+        Args:
+            seq (int): board bomb number, detonation and kill credit order
+        """
         self.user = user
         Entity.__init__(self, position, mailbox)
         self.exploded = False
-        # Start detonation
-        self.state_interval = self.STATE_INTERVAL
+        self.seq = seq
 
     def get_name(self):
         return f"{EntitiesNames.BOMB}"
 
-    def message_handle(self):
-        Entity.message_handle(self)
-        self.state_update()
+    def start_timers(self):
+        # Fuse
+        self.start_states()
 
     def get_state(self):
         return {"bomb_state": self.state, **Entity.get_state(self)}
 
     def kill(self):
         Entity.kill(self)
-        self.mailbox.send_to_list(EntitiesNames.BOARD, Messages.BOOM, self)
+        # Chained bombs are detonated by the board directly
+        if not self.exploded:
+            self.mailbox.send_to_list(EntitiesNames.BOARD, Messages.BOOM, self)
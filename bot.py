@@ -1,45 +1,99 @@
-from constants import Messages, InitValues
+from constants import Messages, EntitiesNames
+from timers import to_ticks
 from user import User
 
 
 class Bot(User):
     # Todo check memory clean
 
+    # Seconds between bot actions
     BOT_DELAY = 0.5
+    # Max target distance (manhattan) to drop a bomb, boards with bot_bombs only
+    BOMB_DISTANCE = 1
+    # Max steps to leave the blast lines
+    FLEE_DISTANCE = 8
+
+    __slots__ = ("game_board", "target", "path", "plan_target")
 
     def __init__(self, game_board, position, mailbox, mod, user_id):
         self.game_board = game_board
         User.__init__(self, None, position, mailbox, mod, user_id)
-        self.target = next(iter(game_board.users)) if game_board.users else None
-        # Todo
+        self.target = game_board.get_target(self)
+        # Planned steps and the target position they lead to, off tick planning only
         self.path = []
-        self._bot_delay = 0
+        self.plan_target = None
 
-    async def update(self):
-        self.bot_update()
-        await User.update(self)
+    def start_timers(self):
+        # First action next tick
+        self.timers.add(0, self, self.bot_update)
 
     def bot_update(self):
-        if self._bot_delay > 0:
-            self._bot_delay -= InitValues.TICKS
-            return
-        else:
-            self._bot_delay = self.BOT_DELAY
+        """Timer callback, bot action every BOT_DELAY"""
+        self.timers.add(to_ticks(self.BOT_DELAY), self, self.bot_update)
 
-        # target update
+        # target update, users first
         if self.target is None or self.target not in self.game_board.users:
-            self.target = next(iter(self.game_board.users)) if self.game_board.users else None
+            self.target = self.game_board.get_target(self)
+
+        if self.blocked:
+            return
+
+        # Leave the blast lines first
+        position = self.get_position()
+        danger = self.game_board.danger
+        step_ticks = to_ticks(self.BOT_DELAY)
+        if not danger.is_safe(position):
+            escape = danger.get_escape(position, step_ticks, self.FLEE_DISTANCE)
+            if escape is not None and escape is not position:
+                self.move_to(escape)
+            return
 
         # target pursuit
-        if self.target is None or self.blocked:
+        if self.target is None:
             return
 
-        path = self.game_board.find_path(self.get_position(), self.target.get_position())
+        target_position = self.target.get_position()
+        distance = abs(position.x - target_position.x) + abs(position.y - target_position.y)
+        if self.game_board.bot_bombs and distance <= self.BOMB_DISTANCE:
+            # Only with a way out of its own blast
+            if self.is_user_can_drop_bomb() and danger.get_escape(
+                    position, step_ticks, self.FLEE_DISTANCE, danger.get_ray(position)[0]) is not None:
+                self.mailbox.send_to_list(EntitiesNames.BOARD, Messages.BOMB, self)
+            return
+
+        if self.game_board.brain is not None:
+            new_position = self.get_planned_step(position, target_position)
+        else:
+            new_position = self.game_board.get_next_step(position, target_position)
 
-        if not path:
+        # Wait rather than step into a blast line
+        if new_position is None or not danger.is_safe(new_position, 1):
             return
-        new_position = path[0]
 
+        self.move_to(new_position)
+
+    def move_to(self, new_position):
         self.game_board.check_explosions(self, new_position)
+        self.mailbox.send(self, Messages.POSITION, new_position)
+
+    def get_planned_step(self, position, target_position):
+        """Next step of the current plan, a new plan is requested when the target moved
+
+        The previous plan is followed until the new one is applied.
 
-        self.mailbox.send(self, {Messages.POSITION: new_position})
+        Returns:
+            Position: next step or None
+        """
+        if not self.path or self.plan_target is not target_position:
+            self.game_board.brain.request(self, position, target_position)
+        if not self.path:
+            return None
+        step = self.path[0]
+        if abs(step.x - position.x) + abs(step.y - position.y) != 1:
+            # Move failed, plan lost
+            self.path = []
+            return None
+        if not self.game_board.is_position_free(step):
+            return None
+        del self.path[0]
+        return step
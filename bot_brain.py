@@ -0,0 +1,168 @@
+import logging
+import threading
+
+from constants import InitValues
+from danger_map import SAFE, is_hit
+from pathfinding import PathFinder
+from position import PositionTable
+
+# Worker side A* finders by board shape, one set per thread (or process)
+_local = threading.local()
+
+
+def _get_finder(length, width):
+    finders = getattr(_local, "finders", None)
+    if finders is None:
+        finders = _local.finders = {}
+    finder = finders.get((length, width))
+    if finder is None:
+        finder = finders[(length, width)] = PathFinder(PositionTable(length, width), None)
+    return finder
+
+
+def plan_paths(length, width, obstacles, requests, max_iter, danger=None):
+    """Worker task, A* paths of a batch of bots on an obstacles snapshot
+
+    Pure function of its (picklable) arguments, runs in a thread or in a
+    process pool.
+
+    Args:
+        length (int): board length
+        width (int): board width
+        obstacles (bytes): static obstacles count (int32) by cell index x * width + y
+        requests ([(int, int)]): (origin, destination) cell indexes
+        max_iter (int): max expanded cells per path
+        danger (tuple, optional): ({cell index: hit tick}, now, ticks per step, explosion ticks, extra
+            cost), cells burning when reached cost more
+
+    Returns:
+        [[int]]: cell indexes path of each request, origin excluded
+    """
+    finder = _get_finder(length, width)
+    blocked = memoryview(obstacles).cast("i")
+    finder.is_blocked = lambda position: blocked[position.x * width + position.y]
+    finder.get_cost = None
+    if danger is not None:
+        hits, now, step_ticks, fade, cost = danger
+
+        def get_cost(index, steps):
+            hit = hits.get(index, SAFE)
+            return cost if hit != SAFE and is_hit(hit, now + steps * step_ticks, step_ticks + 1, fade) else 0
+
+        finder.get_cost = get_cost
+    at = finder.positions.at
+    paths = []
+    for origin, destination in requests:
+        path = finder.find_path(at(origin), at(destination), max_iter)
+        paths.append([position.x * width + position.y for position in path])
+    return paths
+
+
+class BotBrain:
+    """Bot path planning off the tick path
+
+    Bots request plans during the tick, the requests of a tick are sent as
+    one batch to the executor with an immutable snapshot of the static
+    obstacles, at most one batch in flight. Results are applied on the
+    first tick they are ready, a bot keeps following its previous plan
+    meanwhile. A plan from a position the bot already left is stale and
+    dropped.
+    """
+
+    def __init__(self, grid, executor, danger, step_ticks, max_iter=InitValues.MAX_BOT_PATH_ITER):
+        """
+        Args:
+            grid (OccupancyGrid): board occupancy index
+            executor (concurrent.futures.Executor): thread or process pool
+            danger (DangerMap): blast hit ticks, plans avoid burning cells
+            step_ticks (int): ticks between two bot steps
+            max_iter (int): max expanded cells per plan
+        """
+        self.grid = grid
+        self.danger = danger
+        self.step_ticks = step_ticks
+        self.executor = executor
+        self.max_iter = max_iter
+        # {bot: (origin, destination)} requests of the next batch
+        self.requests = {}
+        # Running batch, its bots and requests
+        self.future = None
+        self.batch = []
+        # Obstacles and hits snapshots and their versions
+        self.snapshot = None
+        self.version = None
+        self.hits = None
+        self.hits_version = None
+        # Batches sent and plans dropped as stale, exported by the board metrics
+        self.batches = 0
+        self.stale = 0
+
+    def request(self, bot, origin, destination):
+        """Ask a plan from origin to destination, replaces the pending request of bot"""
+        self.requests[bot] = (origin, destination)
+
+    def get_snapshot(self):
+        if self.version != self.grid.obstacles_version:
+            self.version = self.grid.obstacles_version
+            self.snapshot = self.grid.obstacles.tobytes()
+        return self.snapshot
+
+    def get_hits(self):
+        if self.hits_version != self.danger.version:
+            self.hits_version = self.danger.version
+            self.hits = dict(self.danger.hits)
+        return self.hits
+
+    def update(self):
+        """Tick start: apply the finished batch, send the next one"""
+        if self.future is not None:
+            if not self.future.done():
+                return
+            self.apply(self.future)
+            self.future = None
+            self.batch = []
+        if not self.requests:
+            return
+        self.batch = list(self.requests.items())
+        self.requests.clear()
+        grid = self.grid
+        for _, (origin, destination) in self.batch:
+            # Walls of unloaded chunks are unknown to the snapshot
+            grid.load_area(origin, InitValues.MAX_FLOW_DISTANCE)
+            grid.load_area(destination, InitValues.MAX_FLOW_DISTANCE)
+        width = grid.width
+        self.batches += 1
+        self.future = self.executor.submit(
+            plan_paths, grid.length, width, self.get_snapshot(),
+            [(origin.x * width + origin.y, destination.x * width + destination.y)
+             for _, (origin, destination) in self.batch],
+            self.max_iter,
+            (self.get_hits(), self.danger.timers.now, self.step_ticks, self.danger.fade, InitValues.DANGER_COST))
+
+    def apply(self, future):
+        try:
+            paths = future.result()
+        except Exception:
+            logging.exception("Bot planning failed")
+            return
+        at = self.grid.positions.at
+        for (bot, (origin, destination)), path in zip(self.batch, paths):
+            # Bots off the board
+            if bot.grid is None:
+                continue
+            path = [at(index) for index in path]
+            position = bot.get_position()
+            if position is not origin:
+                if position not in path:
+                    self.stale += 1
+                    continue
+                path = path[path.index(position) + 1:]
+            bot.path = path
+            bot.plan_target = destination
+
+    def close(self):
+        if self.future is not None:
+            self.future.cancel()
+            self.future = None
+        self.requests.clear()
+        self.batch = []
@@ -12,7 +12,19 @@ class InitValues:
     WALLS = 20
     MAX_USERS = 4
     TICKS = 0.02
+    MAX_CATCH_UP_TICKS = 5
     MAX_PATH_ITER = 10
+    # Max A* expanded cells of an off tick bot plan
+    MAX_BOT_PATH_ITER = 4096
+    # Extra path steps of crossing a cell while it burns
+    DANGER_COST = 32
+    # Bot planning threads of a room manager
+    BOT_WORKERS = 1
+    MAX_FLOW_DISTANCE = 64
+    # Side of the square board chunks, lazy storage and map generation unit
+    CHUNK_SIZE = 16
+    # Cells around a user whose map updates it gets, rounded up to whole chunks
+    VIEW_RADIUS = 24
 
 
 class Messages:
@@ -34,8 +46,10 @@ class Messages:
     MOVE = "move"
     # Position
     BOMB = "bomb"
-    # Entity
+    # (Entity, killer User)
     TO_KILL = "to_kill"
+    # (mod, text)
+    LOGS = "logs"
 
 
 class EntitiesNames:
@@ -48,6 +62,22 @@ class EntitiesNames:
     LOG = "log"
 
 
+class MapTypes:
+    """Wall layouts, RANDOM draws the walls up front, the others are generated chunk by chunk"""
+    RANDOM = "random"
+    CLASSIC = "classic"
+    CAVE = "cave"
+    ROOMS = "rooms"
+    ALL = [RANDOM, CLASSIC, CAVE, ROOMS]
+
+
+class Protocols:
+    """Websocket subprotocols, by server preference"""
+    BINARY = "bomberman.bin"
+    JSON = "bomberman.json"
+    ALL = [BINARY, JSON]
+
+
 class Directions:
     VERTICAL = "v"
     HORIZONTAL = "h"
@@ -0,0 +1,273 @@
+from collections import deque
+
+from bomb import Bomb
+from constants import EntitiesNames
+from explosion import Explosion
+from geometry import get_geometry
+from timers import to_ticks
+
+# Hit tick of a cell no blast reaches
+SAFE = 2 ** 31 - 1
+
+
+def is_hit(hit, arrival, stay, fade):
+    """Check if a cell hit at tick hit, burning fade ticks, is burning while occupied
+
+    Args:
+        hit (int): hit tick of the cell, SAFE if none
+        arrival (int): tick the cell is entered
+        stay (int): ticks spent on the cell
+        fade (int): ticks an explosion burns
+    """
+    return hit < arrival + stay and arrival < hit + fade
+
+
+class DangerMap:
+    """Tick each cell is next hit by a blast, kept up to date by the OccupancyGrid
+
+    Live bombs cast their blast rays (stopped by walls, like get_blast) on
+    the cells with their detonation tick, lowered to the tick of a bomb
+    whose ray reaches them (chain reaction). Live explosions burn their
+    cell from the tick they were lit. Rays are only recomputed for the
+    bombs a wall change crosses or uncovers, and the bombs a leaving or
+    cut ray had chained, never the whole board.
+
+    Moving entities are ignored, a ray may be stopped earlier by a user.
+    """
+
+    def __init__(self, grid, timers):
+        """
+        Args:
+            grid (OccupancyGrid): board occupancy index
+            timers (Timers): board timers, current tick
+        """
+        self.grid = grid
+        self.timers = timers
+        self.width = grid.width
+        # Neighbor and ray tables of the board size, no wrap-around (same as get_blast)
+        self.geometry = get_geometry(grid.length, grid.width)
+        # Bomb fuse (detonated by the board the tick after its last state) and explosion burn, in ticks
+        self.fuse = len(Bomb.STATE) * to_ticks(Bomb.STATE_INTERVAL) + 1
+        self.fade = len(Explosion.STATE) * to_ticks(Explosion.STATE_INTERVAL)
+        # {cell index: first hit tick}, cells in danger only
+        self.hits = {}
+        # {cell index: {source: hit tick}}, sources are bombs and explosions
+        self._sources = {}
+        # {bomb: (hit tick, [ray cell index], [stopping wall cell index])}
+        self._rays = {}
+        # {bomb: own detonation tick}, before any chain reaction
+        self._fuses = {}
+        # {wall cell index: {bomb: None}} walls stopping rays
+        self._stops = {}
+        # Incremented when a hit changes
+        self.version = 0
+
+    def is_safe(self, position, delay=0):
+        """Check if no blast will reach position from now + delay on"""
+        hit = self.hits.get(position.x * self.width + position.y, SAFE)
+        return hit == SAFE or hit + self.fade <= self.timers.now + delay
+
+    def get_cost(self, index, steps, step_ticks, cost):
+        """Path cost of entering cell index after steps steps of step_ticks ticks
+
+        Returns:
+            int: cost if the cell burns while crossed, else 0
+        """
+        hit = self.hits.get(index, SAFE)
+        if hit == SAFE:
+            return 0
+        return cost if is_hit(hit, self.timers.now + steps * step_ticks, step_ticks + 1, self.fade) else 0
+
+    def get_ray(self, position):
+        """Cells reached by a blast at position, walls excluded
+
+        Returns:
+            ([int], [int]): reached cell indexes, walls stopping the rays
+        """
+        get_entities, at = self.grid.get_entities, self.grid.positions.at
+        index = position.x * self.width + position.y
+        cells = [index]
+        stops = []
+        for ray, _ in self.geometry.get_rays(index):
+            for cell in ray:
+                if any(entity.DESTRUCTIBLE and not entity.MOBILE for entity in get_entities(at(cell))):
+                    stops.append(cell)
+                    break
+                cells.append(cell)
+        return cells, stops
+
+    def _set_source(self, index, source, tick):
+        sources = self._sources.get(index)
+        if sources is None:
+            sources = self._sources[index] = {}
+        sources[source] = tick
+        hit = min(sources.values())
+        if self.hits.get(index) != hit:
+            self.hits[index] = hit
+            self.version += 1
+
+    def _remove_source(self, index, source):
+        sources = self._sources.get(index)
+        if sources is None or sources.pop(source, None) is None:
+            return
+        if sources:
+            hit = min(sources.values())
+        else:
+            del self._sources[index]
+            hit = None
+        if self.hits.get(index) != hit:
+            if hit is None:
+                del self.hits[index]
+            else:
+                self.hits[index] = hit
+            self.version += 1
+
+    def _cast(self, bomb, tick):
+        """Cast the ray of bomb at tick, lower the hit tick of the bombs it reaches"""
+        pending = [(bomb, tick)]
+        while pending:
+            bomb, tick = pending.pop()
+            self._clear(bomb)
+            cells, stops = self.get_ray(bomb.get_position())
+            self._rays[bomb] = (tick, cells, stops)
+            for index in stops:
+                self._stops.setdefault(index, {})[bomb] = None
+            at = self.grid.positions.at
+            for index in cells:
+                self._set_source(index, bomb, tick)
+                for other in self.grid.get_bombs(at(index)):
+                    ray = self._rays.get(other)
+                    if ray is not None and ray[0] > tick:
+                        pending.append((other, tick))
+
+    def _clear(self, bomb):
+        ray = self._rays.pop(bomb, None)
+        if ray is None:
+            return
+        for index in ray[1]:
+            self._remove_source(index, bomb)
+        for index in ray[2]:
+            # Dropped already when the wall left
+            stopped = self._stops.get(index)
+            if stopped is not None:
+                stopped.pop(bomb, None)
+                if not stopped:
+                    del self._stops[index]
+
+    def _get_chained(self, bombs):
+        """Get bombs and the bombs their rays lowered to the same tick, transitively"""
+        chained = dict.fromkeys(bombs)
+        pending = list(bombs)
+        at = self.grid.positions.at
+        while pending:
+            tick, cells, _ = self._rays[pending.pop()]
+            for index in cells:
+                for other in self.grid.get_bombs(at(index)):
+                    ray = self._rays.get(other)
+                    if other not in chained and ray is not None and ray[0] == tick:
+                        chained[other] = None
+                        pending.append(other)
+        return chained
+
+    def _reset(self, bombs):
+        """Cast bombs again from their own fuse, lowered by the rays still reaching them"""
+        for bomb in bombs:
+            self._clear(bomb)
+        for bomb in bombs:
+            position = bomb.get_position()
+            hit = self.hits.get(position.x * self.width + position.y, SAFE)
+            self._cast(bomb, min(self._fuses[bomb], hit))
+
+    def add(self, entity, position):
+        """OccupancyGrid hook, entity indexed at position"""
+        index = position.x * self.width + position.y
+        if entity.get_name() == EntitiesNames.BOMB:
+            self._fuses[entity] = self.timers.now + self.fuse
+            # Its cell may be reached by another ray (chain) or burning
+            self._cast(entity, min(self._fuses[entity], self.hits.get(index, SAFE)))
+        elif entity.EXPLODING:
+            self._set_source(index, entity, self.timers.now)
+        elif entity.DESTRUCTIBLE and not entity.MOBILE:
+            # The wall cuts the rays crossing its cell, the bombs they chained may not be reached anymore
+            crossing = [source for source in self._sources.get(index, ()) if source in self._rays]
+            if crossing:
+                self._reset(self._get_chained(crossing))
+
+    def remove(self, entity, position):
+        """OccupancyGrid hook, entity dropped from position"""
+        index = position.x * self.width + position.y
+        if entity.get_name() == EntitiesNames.BOMB:
+            if entity not in self._rays:
+                return
+            # The bombs it chained detonate on their own fuse again, unless another ray reaches them
+            chained = self._get_chained([entity])
+            del chained[entity]
+            self._clear(entity)
+            del self._fuses[entity]
+            self._reset(chained)
+        elif entity.EXPLODING:
+            self._remove_source(index, entity)
+        elif entity.DESTRUCTIBLE and not entity.MOBILE:
+            # The rays it stopped go further
+            for bomb in list(self._stops.pop(index, ())):
+                if bomb in self._rays:
+                    self._cast(bomb, self._rays[bomb][0])
+
+    def ignite(self, explosion):
+        """A blast lit a live explosion again, it burns from now"""
+        position = explosion.get_position()
+        self._set_source(position.x * self.width + position.y, explosion, self.timers.now)
+
+    def get_escape(self, origin, step_ticks, max_steps, blast=None):
+        """First step of the shortest walk from origin to a cell no blast will reach
+
+        Walks around static obstacles and the occupied neighbors of origin,
+        every cell crossed must not burn while the walker stands on it.
+
+        Args:
+            origin (Position): start position
+            step_ticks (int): ticks between two steps
+            max_steps (int): max walk length
+            blast ([int], optional): cell indexes of an extra blast hitting at now + fuse (bomb about
+                to be dropped)
+
+        Returns:
+            Position: first step, origin if already safe, None without escape
+        """
+        grid, width, hits, fade = self.grid, self.width, self.hits, self.fade
+        now = self.timers.now
+        grid.load_area(origin, max_steps)
+        extra = set(blast) if blast is not None else ()
+        blast_hit = now + self.fuse
+
+        def get_hit(index):
+            hit = hits.get(index, SAFE)
+            return min(hit, blast_hit) if index in extra else hit
+
+        start = origin.x * width + origin.y
+        if get_hit(start) + fade <= now:
+            return origin
+        get_position, is_blocked, neighbors = grid.positions.at, grid.is_blocked, self.geometry.neighbors
+        # {cell index: first step index}
+        first = {start: None}
+        queue = deque([(start, 0)])
+        while queue:
+            index, steps = queue.popleft()
+            if steps >= max_steps:
+                continue
+            arrival = now + (steps + 1) * step_ticks
+            for table in neighbors:
+                neighbor = table[index]
+                if neighbor < 0 or neighbor in first or grid.obstacles[neighbor]:
+                    continue
+                # Users and bots around only block the first step
+                if not steps and is_blocked(get_position(neighbor)):
+                    continue
+                hit = get_hit(neighbor)
+                if is_hit(hit, arrival, step_ticks + 1, fade):
+                    continue
+                first[neighbor] = first[index] if first[index] is not None else neighbor
+                if hit == SAFE or hit + fade <= arrival:
+                    return get_position(first[neighbor])
+                queue.append((neighbor, steps + 1))
+        return None
@@ -1,48 +1,78 @@
-from constants import Messages, EntitiesNames, InitValues
+from constants import EntitiesNames
+from mailbox import NO_MESSAGE
+from timers import to_ticks
 import logging
 
 
 class Entity:
     DESTRUCTIBLE = False
     BLOCKABLE = False
+    EXPLODING = False
+    # Moving entities are not obstacles for the shared path fields
+    MOBILE = False
     STATE = [0]
+    # Seconds between dying states
     STATE_INTERVAL = 0
 
+    __slots__ = ("_position", "mailbox", "blocked", "killed", "_dead", "message_queue", "mail_slot", "state_index",
+                 "state", "state_end", "grid", "timers")
+
     def __init__(self, position, mailbox):
         self._position = position
         self.mailbox = mailbox
         self.blocked = False
         self.killed = None
         self._dead = False
-        self.message_queue = {}
-        self.state_iterator = iter(self.STATE)
-        self.state = next(self.state_iterator)
-        self.state_interval = 0
+        # Mail of the tick (delivered by MailBox.drop), None without messages
+        self.message_queue = None
+        # MailBox records, allocated on the first message
+        self.mail_slot = None
+        # Index of state in STATE
+        self.state_index = 0
+        self.state = self.STATE[0]
+        # Tick of the next state, running dying states only
+        self.state_end = None
+        # Board occupancy index and timers, set when the entity is spawned on a board
+        self.grid = None
+        self.timers = None
 
     def __str__(self):
         return f"{self.get_name()} {self.get_pos_tuple()}"
 
-    async def update(self):
-        self.message_queue = self.mailbox.get(self)
+    def update(self):
         self.message_handle()
-        if self.message_queue:
-            # Todo Exceptions
-            error_mess = f"message_queue should be empty {self.message_queue}"
-            logging.exception(error_mess)
-            raise Exception(error_mess)
+        mail = self.message_queue
+        if mail is not None:
+            self.message_queue = None
+            mail.pending = False
+            if not mail.is_empty():
+                # Todo Exceptions
+                error_mess = f"message_queue should be empty {mail}"
+                logging.exception(error_mess)
+                raise Exception(error_mess)
+
+    def start_timers(self):
+        """Spawned on a board, register the entity timers"""
+        pass
 
     def message_handle(self):
-        if not self.message_queue:
+        mail = self.message_queue
+        if mail is None:
             return
         self.killed_message_handle()
-        if Messages.POSITION in self.message_queue:
-            self.set_position(self.message_queue.pop(Messages.POSITION))
-        if Messages.BLOCKED in self.message_queue:
-            self.blocked = self.message_queue.pop(Messages.BLOCKED)
+        if mail.position is not NO_MESSAGE:
+            self.set_position(mail.position)
+            mail.position = NO_MESSAGE
+        if mail.blocked is not NO_MESSAGE:
+            self.blocked = mail.blocked
+            mail.blocked = NO_MESSAGE
+            self.mark_dirty()
 
     def killed_message_handle(self):
-        if Messages.KILLED in self.message_queue:
-            killed = self.message_queue.pop(Messages.KILLED)
+        mail = self.message_queue
+        if mail.killed is not NO_MESSAGE:
+            killed = mail.killed
+            mail.killed = NO_MESSAGE
             if self.killed is None or killed is None:
                 self.killed = killed
                 self.kill()
@@ -55,20 +85,31 @@ class Entity:
 
     def kill(self):
         self._dead = True
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        """Flag the entity cell for the next map update"""
+        if self.grid is not None:
+            self.grid.mark_dirty(self)
+
+    def start_states(self):
+        """Start dying states, the next one in STATE_INTERVAL"""
+        delay = to_ticks(self.STATE_INTERVAL)
+        self.state_end = self.timers.now + delay
+        self.timers.add(delay, self, self.state_update)
 
     def state_update(self):
-        """Update dying states"""
-        message = {}
-        if self.state_interval < 0:
-            if self.state == self.STATE[-1]:
-                self.kill()
-            else:
-                self.state = next(self.state_iterator)
-                self.state_interval = self.STATE_INTERVAL
+        """Timer callback, next dying state or death after the last one"""
+        if self.timers.now < self.state_end:
+            # States restarted since this timer was set
+            return
+        if self.state_index == len(self.STATE) - 1:
+            self.kill()
         else:
-            self.state_interval -= InitValues.TICKS
-        if message:
-            self.mailbox.send(self, message)
+            self.state_index += 1
+            self.state = self.STATE[self.state_index]
+            self.mark_dirty()
+            self.start_states()
 
     def get_pos_tuple(self):
         return self._position.x, self._position.y
@@ -79,6 +120,8 @@ class Entity:
     def set_position(self, position):
         if not self.blocked:
             self._position = position
+            if self.grid is not None:
+                self.grid.move(self)
 
     def get_name(self):
         return f"{EntitiesNames.ENTITY}"
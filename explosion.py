@@ -3,26 +3,39 @@ from entity import Entity
 
 
 class Explosion(Entity):
+    EXPLODING = True
     STATE = [1, 2]
     STATE_INTERVAL = 0.5
 
+    __slots__ = ("user", "direction", "entities_to_kill")
+
     def __init__(self, position, mailbox, user, direction):
         self.user = user
         Entity.__init__(self, position, mailbox)
         self.direction = direction
-        self.entities_to_kill = set()
-        # Start detonation
-        self.state_interval = self.STATE_INTERVAL
+        # {entity: killer}
+        self.entities_to_kill = {}
 
     def get_name(self):
         return f"{EntitiesNames.EXPLOSION}"
 
+    def start_timers(self):
+        # Fade
+        self.start_states()
+
     def message_handle(self):
         Entity.message_handle(self)
-        self.state_update()
-
-        if Messages.TO_KILL in self.message_queue:
-            self.entities_to_kill.update(set(self.message_queue.pop(Messages.TO_KILL)))
+        mail = self.message_queue
+        if mail is not None and mail.to_kill:
+            self.entities_to_kill.update(mail.to_kill)
+            mail.to_kill.clear()
+
+    def ignite(self):
+        """Restart detonation, another blast reaches the cell"""
+        self.state_index = 0
+        self.state = self.STATE[0]
+        self.start_states()
+        self.mark_dirty()
 
     def get_state(self):
         return {
@@ -33,5 +46,7 @@ class Explosion(Entity):
 
     def kill(self):
         Entity.kill(self)
-        for entity in self.entities_to_kill:
-            self.mailbox.send(entity, {Messages.KILLED: self.user})
+        for entity, killer in self.entities_to_kill.items():
+            # Already killed by another explosion (and maybe removed from the board)
+            if not entity.is_dead():
+                self.mailbox.send(entity, Messages.KILLED, killer)
@@ -0,0 +1,88 @@
+from collections import deque
+
+from geometry import get_geometry
+
+
+class FlowFields:
+    """BFS distance fields toward targets, shared by every bot chasing them
+
+    A field holds {cell index x * width + y: number of steps} to the target
+    cell around the static obstacles of the occupancy grid, for the cells
+    reachable within max_distance only, whatever the board size. Fields are computed on
+    first use and reused until the target cell or the obstacles change.
+    """
+
+    MAX_FIELDS = 16
+
+    def __init__(self, grid, max_distance):
+        """
+        Args:
+            grid (OccupancyGrid): board occupancy index
+            max_distance (int): BFS depth limit
+        """
+        self.grid = grid
+        self.length = grid.length
+        self.width = grid.width
+        self.max_distance = max_distance
+        # Neighbor tables of the board size, no wrap-around (same as PathFinder)
+        self.neighbors = get_geometry(self.length, self.width).neighbors
+        # {target cell index: distances}
+        self.fields = {}
+        self.version = grid.obstacles_version
+        self.computed = 0
+
+    def get_field(self, target):
+        """Get the distance field toward target position"""
+        # Obstacles are only indexed in loaded chunks
+        self.grid.load_area(target, self.max_distance)
+        if self.version != self.grid.obstacles_version:
+            self.version = self.grid.obstacles_version
+            self.fields.clear()
+
+        target_index = target.x * self.width + target.y
+        field = self.fields.get(target_index)
+        if field is None:
+            if len(self.fields) >= self.MAX_FIELDS:
+                del self.fields[next(iter(self.fields))]
+            field = self.fields[target_index] = self._compute(target_index)
+        return field
+
+    def _compute(self, target_index):
+        self.computed += 1
+        neighbors = self.neighbors
+        obstacles = self.grid.obstacles
+        distances = {target_index: 0}
+        queue = deque([target_index])
+        while queue:
+            index = queue.popleft()
+            distance = distances[index] + 1
+            if distance > self.max_distance:
+                continue
+            for table in neighbors:
+                neighbor = table[index]
+                if neighbor >= 0 and neighbor not in distances and not obstacles[neighbor]:
+                    distances[neighbor] = distance
+                    queue.append(neighbor)
+        return distances
+
+    def get_next_step(self, origin, target):
+        """Get the neighbor of origin closest to target
+
+        Returns:
+            Position: next step, None if origin is out of the field of target
+                or has no closer neighbor
+        """
+        field = self.get_field(target)
+        index = origin.x * self.width + origin.y
+        distance = field.get(index, -1)
+        if distance == 0:
+            return None
+        step, step_distance = None, distance
+        for table in self.neighbors:
+            neighbor = table[index]
+            if neighbor >= 0:
+                neighbor_distance = field.get(neighbor, -1)
+                # Origin may be off the field when standing on an obstacle (bomb)
+                if neighbor_distance != -1 and (step_distance == -1 or neighbor_distance < step_distance):
+                    step, step_distance = neighbor, neighbor_distance
+        return self.grid.positions.at(step) if step is not None else None
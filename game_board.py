@@ -1,97 +1,176 @@
-import asyncio
+import functools
 import json
 import logging
 import random
+import time
 from uuid import uuid1
 
 import websockets
 
+from board_arrays import BoardArrays
 from bomb import Bomb
 from bot import Bot
-from constants import Moves, InitValues, Messages, EntitiesNames, Directions
-from entity import Entity
+from bot_brain import BotBrain
+from constants import Moves, InitValues, Messages, EntitiesNames, Directions, Protocols, MapTypes
+from danger_map import DangerMap
 from explosion import Explosion
+from flow_field import FlowFields
+from geometry import get_geometry
+from inbound import InputQueue
+from interest import InterestManager
 from mailbox import MailBox
-from position import Position
+from map_generators import GENERATORS
+from metrics import BoardMetrics
+from occupancy import OccupancyGrid
+from outbound import OutboundQueue
+from pathfinding import PathFinder
+from position import PositionTable
+from protocol import encode
+from snapshot import WorldSnapshot
+from timers import Timers, to_ticks
 from user import User
 from wall import Wall
 
 
-def _make_moves():
-    return {
-        Moves.RIGHT: lambda pos: (Position(pos.x + 1, pos.y) if pos.x + 1 < InitValues.LENGTH else Position(0, pos.y)),
-        Moves.LEFT: lambda pos: (
-            Position(pos.x - 1, pos.y) if pos.x - 1 >= 0 else Position(InitValues.LENGTH - 1, pos.y)),
-        Moves.DOWN: lambda pos: (Position(pos.x, pos.y + 1) if pos.y + 1 < InitValues.WIDTH else Position(pos.x, 0)),
-        Moves.UP: lambda pos: (Position(pos.x, pos.y - 1) if pos.y - 1 >= 0 else Position(pos.x, InitValues.WIDTH - 1))}
-
-
 class GameBoard:
-    def __init__(self):
+    def __init__(self, length=InitValues.LENGTH, width=InitValues.WIDTH, walls=InitValues.WALLS, seed=None,
+                 arrays=False, map_type=MapTypes.RANDOM, bot_executor=None, bot_bombs=False):
+        """
+        Args:
+            walls (int): random walls drawn, RANDOM map only
+            seed (int, optional): board random seed
+            arrays (bool): NumPy board arrays
+            map_type (str): MapTypes wall layout, generated chunk by chunk except RANDOM
+            bot_executor (concurrent.futures.Executor, optional): bots plan their paths in this pool, off
+                the tick, instead of reading the flow fields in the tick (deterministic)
+            bot_bombs (bool): bots drop bombs next to their target (headless bot matches), live rooms
+                bots only chase the players
+        """
+        self.length = length
+        self.width = width
+        self.nb_walls = walls
+        self.map_type = map_type
+        # Seed of the generated walls, drawn by make_walls
+        self.map_seed = None
+        # Board own random generator, seeded for reproducible games
+        self.random = random.Random(seed)
         self.mailbox = MailBox()
-        self.explosions_lock = asyncio.Lock()
-        self.users_lock = asyncio.Lock()
-        self.walls_lock = asyncio.Lock()
-        self.bombs_lock = asyncio.Lock()
-        self.bots_lock = asyncio.Lock()
+        # The tick is synchronous, board state needs no lock
         self.explosions = set()
         self.users = set()
         self.walls = set()
         self.bombs = set()
         self.bots = set()
+        # Bomb fuses, explosion fades, cooldowns and bot actions, by tick number
+        self.timers = Timers()
+        # Entities which died during this tick, removed by clean_entities, {entity: None} ordered set
+        self.dead = {}
+        # Users with coalesced socket inputs waiting for the next tick
+        self.inputs = []
+        # One Position object per cell, created by chunk, positions compare by identity
+        self.positions = PositionTable(length, width)
+        # Optional NumPy view of the board, vectorized blasts
+        self.arrays = None
+        if arrays:
+            if BoardArrays.is_available():
+                self.arrays = BoardArrays(length, width)
+            else:
+                logging.warning("NumPy is not installed, board arrays disabled")
+        self.grid = OccupancyGrid(self.positions, self.arrays)
+        # Next blast hit tick of the cells, kept up to date by the grid
+        self.danger = self.grid.danger = DangerMap(self.grid, self.timers)
+        self.path_finder = PathFinder(self.positions, self.grid.is_blocked, self.get_danger_cost)
+        # Users views, map updates are filtered by chunk
+        self.interest = InterestManager(self.positions, InitValues.VIEW_RADIUS)
+        self.flow_fields = FlowFields(self.grid, InitValues.MAX_FLOW_DISTANCE)
+        self.bot_bombs = bot_bombs
+        self.brain = None
+        if bot_executor is not None:
+            self.brain = BotBrain(self.grid, bot_executor, self.danger, to_ticks(Bot.BOT_DELAY))
         self.mods = {mod: 0 for mod in range(1, 5)}
+        self._uids = 0
+        # Bombs numbering, detonation order
+        self._bombs_seq = 0
+        # Entities hit by a blast during this board update
+        self.blasted = set()
         self.game_map = self.create_map()
+        self.snapshot = WorldSnapshot()
+        for position, cell in self.game_map.items():
+            self.snapshot.update(position, self._create_cell_message(position, cell))
         self.make_walls()
-        self.dict_moves = _make_moves()
-        # self.tmp = 0
+        # Neighbor and ray tables shared by the boards of this size
+        self.geometry = get_geometry(length, width)
+        self.metrics = BoardMetrics()
 
     def get_entities(self):
         return [self.users, self.walls, self.bombs, self.explosions, self.bots]
 
-    def get_destructible_entities(self):
-        killable_entities_by_pos = {}
-        for entities in self.get_entities():
-            if entities and next(iter(entities)).DESTRUCTIBLE:
-                killable_entities_by_pos.update({e.get_position(): e for e in entities})
-        return killable_entities_by_pos
+    def spawn(self, entity, entity_set):
+        """Add entity to its board set and to the occupancy index"""
+        entity.grid = self.grid
+        entity.timers = self.timers
+        self.grid.add(entity)
+        entity_set.add(entity)
+        entity.start_timers()
+
+    def despawn(self, entity, entity_set):
+        """Remove entity from its board set and from the occupancy index"""
+        entity_set.discard(entity)
+        self.grid.remove(entity)
+        self.mailbox.discard(entity)
+        # Its pending timers are dropped when due
+        entity.grid = None
+        entity.timers = None
 
     def create_map(self):
-        game_map = dict()
-        for line in range(InitValues.LENGTH):
-            for col in range(InitValues.WIDTH):
-                game_map[Position(line, col)] = dict()
+        """Get {position: {entity: state}} of the occupied cells"""
+        game_map = {}
 
         for entities in self.get_entities():
             for entity in entities:
-                game_map[entity.get_position()][entity] = entity.get_state()
+                game_map.setdefault(entity.get_position(), {})[entity] = entity.get_state()
 
         return game_map
 
-    def create_server(self, ip, port):
-        return websockets.serve(self.game, ip, port)
-
     def get_next_mod(self):
         mod = min(self.mods, key=self.mods.get)
         self.mods[mod] += 1
         return mod
 
-    def get_init_state(self, user_id):
-        """Get init state"""
-        state = {"length": InitValues.LENGTH, "width": InitValues.WIDTH, "id": user_id}
+    def get_next_uid(self):
+        self._uids += 1
+        return self._uids
+
+    def get_init_state(self, user):
+        """Get init state
 
-        # Get all map for init
+        The entities part is the shared pre-encoded snapshot of the last
+        notified game map in the user view, the next map delta brings later
+        changes.
+        """
+        state = json.dumps({"type": "init", "length": self.length, "width": self.width,
+                            "id": user.id, "uid": user.uid})
+        body = self.snapshot.get_init_body(self.interest.views.get(user))
+        return f"{state[:-1]}, {body}}}" if body else state
+
+    @staticmethod
+    def _create_cell_message(position, cell):
+        """Get map message {entity name: [state]} of cell {entity: state}, grass if the cell is empty"""
         message = dict()
-        for entities in self.get_entities():
-            for entity in entities:
-                if entity.get_name() in message:
-                    message[entity.get_name()].append(entity.get_state())
-                else:
-                    message[entity.get_name()] = [entity.get_state()]
+        if cell:
+            for entity, state in cell.items():
+                message.setdefault(entity.get_name(), []).append(state)
+        else:
+            message[EntitiesNames.ENTITY] = [{"x": position.x, "y": position.y, "dead": False}]
+        return message
 
-        if message:
-            state.update(message)
+    def get_snapshot_message(self, protocol=Protocols.JSON, view=None):
+        """Full map message of the last notified game map, in view chunks if any"""
+        return self.snapshot.get_map(protocol, view)
 
-        return json.dumps({"type": "init", **state})
+    def get_view_snapshot(self, user):
+        """Full map message of the last notified game map in the user view"""
+        return self.get_snapshot_message(user.protocol, self.interest.views.get(user))
 
     def create_message(self):
         """Create message to notify users about map update
@@ -100,202 +179,392 @@ class GameBoard:
             dict : {{"type": "map"}{ updated : entities }} OR None
         """
         message = dict()
-        new_game_map = self.create_map()
+        # [(position, cell message)]
+        changes = []
+
+        # Only cells flagged by their entities (or left by them) can differ. Reading a cell of an
+        # unloaded chunk (left by the walls of a previous layout) loads it, its cells are flagged in turn
+        dirty = self.grid.pop_dirty()
+        while dirty:
+            for position in sorted(dirty, key=lambda p: p.position):
+                cell = {e: e.get_state() for e in self.grid.get_entities(position)}
+                if self.game_map.get(position, {}) == cell:
+                    continue
+                if cell:
+                    self.game_map[position] = cell
+                else:
+                    self.game_map.pop(position, None)
+                cell_message = self._create_cell_message(position, cell)
+                self.snapshot.update(position, cell_message)
+                changes.append((position, cell_message))
+                for name, states in cell_message.items():
+                    message.setdefault(name, []).extend(states)
+            dirty = self.grid.pop_dirty()
+
+        self.interest.set_changes(changes)
+        if message:
+            self.snapshot.commit()
+            message.update({"type": "map"})
+            return message
+        return None
 
-        def _update_message(entity):
-            if entity.get_name() in message:
-                message[entity.get_name()].append(entity.get_state())
+    def notify(self, message, collapsible=False):
+        """
+        Queue game updates for all users, never waits on sockets
+
+        Args:
+            message (dict): message to send, encoded once per user protocol
+            collapsible (bool): map delta that a snapshot can replace
+        """
+        # {protocol: encoded message}
+        payloads = {}
+        for user in self.users:
+            if user.outbound is not None:
+                if user.protocol not in payloads:
+                    payloads[user.protocol] = encode(message, user.protocol)
+                user.outbound.put(payloads[user.protocol], collapsible)
+
+    def notify_map(self, message):
+        """Queue the map delta of each user view, never waits on sockets
+
+        Users of a same view share its encoded delta. A user whose view
+        moved gets a view message instead.
+
+        Args:
+            message (dict): map delta of the whole board, None without change
+        """
+        interest = self.interest
+        # {protocol: encoded message} of the whole board view
+        payloads = {}
+        for user in self.users:
+            old_view = interest.views.get(user)
+            view = interest.get_view(user.get_position())
+            interest.views[user] = view
+            if user.outbound is None:
+                continue
+            if view is not old_view and view != old_view:
+                view_message = self.create_view_message(old_view, view)
+                if view_message:
+                    user.outbound.put(encode(view_message, user.protocol))
+            elif view is None:
+                if message:
+                    if user.protocol not in payloads:
+                        payloads[user.protocol] = encode(message, user.protocol)
+                    user.outbound.put(payloads[user.protocol], collapsible=True)
             else:
-                message[entity.get_name()] = [entity.get_state()]
+                payload = interest.get_payload(view, user.protocol)
+                if payload is not None:
+                    user.outbound.put(payload, collapsible=True)
 
-        for position in new_game_map:
-            if self.game_map[position] != new_game_map[position]:
-                if new_game_map[position]:
-                    for e in new_game_map[position]:
-                        _update_message(e)
-                else:
-                    _update_message(Entity(position, self.mailbox))
+    def create_view_message(self, old_view, view):
+        """Map message of a moving view
+
+        The tick changes of the chunks staying in view, the full state of
+        the chunks entering it and grass on the cells of the chunks leaving
+        it. Full states include grass on every cell emptied since the board
+        start: the user may have missed that change (collapsed deltas) and
+        still show the cell occupied.
 
-        self.game_map = new_game_map
+        Args:
+            old_view (frozenset): chunks of the last notified view
+            view (frozenset): chunks of the new view
 
+        Returns:
+            dict: map message, None if empty
+        """
+        message = self.interest.get_states(old_view & view)
+        # Emptied cells, the tick changes included
+        grass = self.snapshot.cells.get(EntitiesNames.ENTITY, {})
+        for chunk in sorted(view - old_view):
+            for position in self.get_chunk_positions(chunk):
+                cell = self.game_map.get(position)
+                if cell or position in grass:
+                    for name, states in self._create_cell_message(position, cell).items():
+                        message.setdefault(name, []).extend(states)
+        for chunk in sorted(old_view - view):
+            for position in self.get_chunk_positions(chunk):
+                if position in self.game_map or position in grass:
+                    message.setdefault(EntitiesNames.ENTITY, []).extend(
+                        self._create_cell_message(position, {})[EntitiesNames.ENTITY])
         if message:
             message.update({"type": "map"})
-            return json.dumps(message)
+            return message
         return None
 
-    async def notify(self, message):
-        """
-        Notify all users about game updates
-        """
-        try:
-            # await user.ws.send(map_message)
-            # Todo player FOV
-            await asyncio.gather(*[user.ws.send(message) for user in self.users])
-        except websockets.exceptions.ConnectionClosed:
-            logging.debug("Connection lost")
-        except Exception:
-            logging.exception("Connection lost for unexpected reasons :")
-            raise
+    def get_chunk_positions(self, chunk):
+        xs, ys = self.positions.get_chunk_bounds(chunk)
+        get_position = self.positions.get
+        return [get_position(x, y) for x in xs for y in ys]
 
-    async def register(self, user):
-        async with self.users_lock:
-            self.users.add(user)
-            logging.info(f"{user} user connected")
+    def register(self, user):
+        user.uid = self.get_next_uid()
+        self.spawn(user, self.users)
+        self.interest.views[user] = self.interest.get_view(user.get_position())
+        logging.info(f"{user} user connected")
         if len(self.bots) <= 0:
-            async with self.bots_lock:
-                bot = Bot(self, self.random_spawn()[0], self.mailbox, self.get_next_mod(), str(uuid1()))
-                self.bots.add(bot)
-
-        self.mailbox.send_to_list(EntitiesNames.LOG, user.mod, "connected")
-
-    async def unregister(self, user):
-        async with self.users_lock:
-            self.mods[user.mod] -= 1
-            logging.info(f"{user} user disconnected")
-            self.users.remove(user)
-            if not self.users:
-                logging.info("No more users, starting sleep mode")
-                self.bots = set()
-                self.make_walls()
-        self.mailbox.send_to_list(EntitiesNames.LOG, user.mod, "disconnected")
-
-    async def put_bomb(self, user):
+            self.add_bot()
+        # The init snapshot holds the changes since the last tick (new room walls, this user, its bot),
+        # the other users get them now
+        self.notify_map(self.create_message())
+        if user.ws is not None:
+            user.outbound = OutboundQueue(user.ws, functools.partial(self.get_view_snapshot, user),
+                                          on_sent=self.metrics.add_sent)
+            user.outbound.put(self.get_init_state(user))
+            user.outbound.start()
+
+        self.mailbox.send_to_list(EntitiesNames.LOG, Messages.LOGS, (user.mod, "connected"))
+
+    def add_bot(self):
+        bot = Bot(self, self.random_spawn()[0], self.mailbox, self.get_next_mod(), str(uuid1()))
+        bot.uid = self.get_next_uid()
+        self.spawn(bot, self.bots)
+        return bot
+
+    def get_target(self, bot):
+        """Target of a bot: the first user, another bot when playing without users"""
+        if self.users:
+            return min(self.users, key=lambda user: user.uid)
+        others = [other for other in self.bots if other is not bot]
+        return min(others, key=lambda other: other.uid) if others else None
+
+    def unregister(self, user):
+        self.mods[user.mod] -= 1
+        logging.info(f"{user} user disconnected")
+        self.despawn(user, self.users)
+        self.interest.views.pop(user, None)
+        if user.inputs is not None:
+            self.metrics.add_inputs(user.inputs)
+            user.inputs = None
+        if user.outbound is not None:
+            self.metrics.add_outbound(user.outbound)
+            user.outbound.close()
+        if not self.users:
+            logging.info("No more users, starting sleep mode")
+            for bot in list(self.bots):
+                self.despawn(bot, self.bots)
+            self.make_walls()
+        self.mailbox.send_to_list(EntitiesNames.LOG, Messages.LOGS, (user.mod, "disconnected"))
+
+    def put_bomb(self, user):
         if not user.is_user_can_drop_bomb():
             return
-        self.mailbox.send(user, {Messages.BOMB_DROPPED: True})
-        async with self.bombs_lock:
-            self.bombs.add(Bomb(user.get_position(), self.mailbox, user))
-
-    async def boom(self, bomb):
-        bomb.exploded = True
-        x, y = bomb.get_pos_tuple()
-        killable_entities_by_pos = self.get_destructible_entities()
-        explosion_list = [Explosion(bomb.get_position(), self.mailbox, bomb.user, Directions.ALL)]
-
-        def explosion_propagation(exp_range, direction):
-            for new in exp_range:
-                if direction == Directions.VERTICAL:
-                    new_pos = Position(new, y)
-                elif direction == Directions.HORIZONTAL:
-                    new_pos = Position(x, new)
-                else:
-                    new_pos = Position(x, y)
-                if new_pos not in killable_entities_by_pos:
-                    explosion_list.append(Explosion(new_pos, self.mailbox, bomb.user, direction))
+        self.mailbox.send(user, Messages.BOMB_DROPPED, True)
+        self._bombs_seq += 1
+        self.spawn(Bomb(user.get_position(), self.mailbox, user, self._bombs_seq), self.bombs)
+
+    def get_blast(self, bomb):
+        """Cells reached by the blast of bomb, rays stop on the first destructible entity
+
+        Returns:
+            ([(Position, str)], [(int, Entity)]): explosions (position, direction) and the
+                destructible entities hit, with the index of the explosion killing them
+        """
+        position = bomb.get_position()
+        index = position.x * self.width + position.y
+        at, get_destructible = self.positions.at, self.grid.get_destructible
+        cells = [(position, Directions.ALL)]
+        kills = []
+
+        # Center first, then the rays to the board edges
+        for ray, direction in ((range(index, index + 1), Directions.ALL),) + self.geometry.get_rays(index):
+            for cell in ray:
+                new_pos = at(cell)
+                killable_entity = get_destructible(new_pos)
+                if killable_entity is None:
+                    cells.append((new_pos, direction))
                 else:
-                    self.mailbox.send_to_list(explosion_list[-1], Messages.TO_KILL, killable_entities_by_pos[new_pos])
-                    self.mailbox.send(killable_entities_by_pos[new_pos], {Messages.BLOCKED: True})
+                    kills.append((len(cells) - 1, killable_entity))
                     break
+        return cells, kills
+
+    def get_blasts(self, bombs):
+        """Blasts of bombs detonating together, same as get_blast for each bomb
 
-        explosion_propagation(range(1), Directions.ALL)
-        explosion_propagation(range((x - 1), -1, -1), Directions.VERTICAL)
-        explosion_propagation(range((x + 1), InitValues.LENGTH), Directions.VERTICAL)
-        explosion_propagation(range((y - 1), -1, -1), Directions.HORIZONTAL)
-        explosion_propagation(range((y + 1), InitValues.WIDTH), Directions.HORIZONTAL)
+        The rays are computed at once on the board arrays when enabled and
+        every chunk is loaded.
 
-        async with self.explosions_lock:
-            self.explosions.update(set(explosion_list))
+        Returns:
+            [([(Position, str)], [(int, Entity)])]: blast of each bomb
+        """
+        # Unloaded chunks are empty in the arrays
+        if self.arrays is None or not bombs or self.grid.nb_unloaded:
+            return [self.get_blast(bomb) for bomb in bombs]
+
+        ray_ends = zip(*self.arrays.get_ray_ends([bomb.get_position() for bomb in bombs]))
+        get_position, get_destructible = self.positions.get, self.grid.get_destructible
+        blasts = []
+        for bomb, (center, up, down, left, right) in zip(bombs, ray_ends):
+            x, y = bomb.get_pos_tuple()
+            cells = [(bomb.get_position(), Directions.ALL)]
+            kills = []
+            # Same as the center ray of get_blast, a second explosion on the bomb when nothing is hit
+            if center:
+                kills.append((0, get_destructible(bomb.get_position())))
+            else:
+                cells.append((bomb.get_position(), Directions.ALL))
+            cells.extend((get_position(new, y), Directions.VERTICAL) for new in range(x - 1, up, -1))
+            if up >= 0:
+                kills.append((len(cells) - 1, get_destructible(get_position(up, y))))
+            cells.extend((get_position(new, y), Directions.VERTICAL) for new in range(x + 1, down))
+            if down < self.length:
+                kills.append((len(cells) - 1, get_destructible(get_position(down, y))))
+            cells.extend((get_position(x, new), Directions.HORIZONTAL) for new in range(y - 1, left, -1))
+            if left >= 0:
+                kills.append((len(cells) - 1, get_destructible(get_position(x, left))))
+            cells.extend((get_position(x, new), Directions.HORIZONTAL) for new in range(y + 1, right))
+            if right < self.width:
+                kills.append((len(cells) - 1, get_destructible(get_position(x, right))))
+            blasts.append((cells, kills))
+        return blasts
+
+    def detonate(self, bombs):
+        """Resolve every bomb detonating this tick in one pass
+
+        A blast reaching a live bomb detonates it in the same pass (chain
+        reaction). Overlapping explosion cells are merged into one
+        Explosion, owned by the first bomb reaching the cell; a live
+        explosion of an earlier tick is ignited again. Each entity is
+        killed once, credited to the first bomb hitting it in seq order,
+        then chain order; entities already blocked by an earlier explosion
+        are not hit again.
+
+        Args:
+            bombs ([Bomb]): bombs whose fuse ended
+        """
+        # {position: Explosion} reached by this pass, new ones are spawned
+        explosions = {}
+        new_explosions = []
+        wave = sorted(bombs, key=lambda bomb: bomb.seq)
+        for bomb in wave:
+            bomb.exploded = True
+        while wave:
+            chained = []
+            for bomb, (cells, kills) in zip(wave, self.get_blasts(wave)):
+                blast_explosions = []
+                for position, direction in cells:
+                    explosion = explosions.get(position)
+                    if explosion is None:
+                        explosion = self.grid.get_explosion(position)
+                        if explosion is not None and not explosion.is_dead():
+                            explosion.ignite()
+                            self.danger.ignite(explosion)
+                        else:
+                            explosion = Explosion(position, self.mailbox, bomb.user, direction)
+                            new_explosions.append(explosion)
+                        explosions[position] = explosion
+                        for other in self.grid.get_bombs(position):
+                            if not other.exploded:
+                                other.exploded = True
+                                chained.append(other)
+                    if explosion.direction != direction:
+                        explosion.direction = Directions.ALL
+                    blast_explosions.append(explosion)
+                for index, killable_entity in kills:
+                    if killable_entity.blocked or killable_entity in self.blasted:
+                        continue
+                    self.blasted.add(killable_entity)
+                    self.mailbox.send_to_list(blast_explosions[index], Messages.TO_KILL, (killable_entity, bomb.user))
+                    self.mailbox.send(killable_entity, Messages.BLOCKED, True)
+            for bomb in chained:
+                bomb.kill()
+                self.dead[bomb] = None
+            wave = sorted(chained, key=lambda bomb: bomb.seq)
+
+        for explosion in new_explosions:
+            self.spawn(explosion, self.explosions)
+
+    def get_users_in_explosions(self):
+        """
+        Returns:
+            [(User, Explosion)]: users standing in an explosion
+        """
+        users = list(self.users)
+        if self.arrays is not None and users:
+            hits = self.arrays.get_in_explosions([user.get_position() for user in users])
+            users = [user for user, hit in zip(users, hits) if hit]
+        hit_users = []
+        for user in users:
+            explosion = self.grid.get_explosion(user.get_position())
+            if explosion is not None:
+                hit_users.append((user, explosion))
+        return hit_users
 
     def find_and_bomb_users(self):
-        explosions_positions = {e.get_position(): e for e in self.explosions}
-        for user in self.users:
-            if user.get_position() in explosions_positions:
-                self.mailbox.send_to_list(explosions_positions[user.get_position()], Messages.TO_KILL, user)
-                self.mailbox.send(user, {Messages.BLOCKED: True})
+        for user, explosion in self.get_users_in_explosions():
+            self.mailbox.send_to_list(explosion, Messages.TO_KILL, (user, explosion.user))
+            self.mailbox.send(user, Messages.BLOCKED, True)
 
     def kill_and_respawn(self, user):
-        self.mailbox.send(user, {Messages.RESET: (self.random_spawn()[0])})
+        self.mailbox.send(user, Messages.RESET, self.random_spawn()[0])
 
     def make_walls(self):
-        self.walls = set()
-        wall_positions = set(self.random_spawn(InitValues.WALLS))
+        """New walls layout, generated chunks are spawned on their first use"""
+        for wall in list(self.walls):
+            self.despawn(wall, self.walls)
+        if self.map_type != MapTypes.RANDOM:
+            self.map_seed = self.random.getrandbits(64)
+            self.grid.set_loader(self.load_chunk)
+            return
+        # Drawn with replacement, deduplicated in draw order
+        wall_positions = dict.fromkeys(self.random_spawn(self.nb_walls))
         for wall_position in wall_positions:
-            self.walls.add(Wall(wall_position, self.mailbox))
+            self.spawn(Wall(wall_position, self.mailbox), self.walls)
+
+    def load_chunk(self, chunk):
+        """Spawn the generated walls of a chunk, occupancy grid loader"""
+        xs, ys = self.positions.get_chunk_bounds(chunk)
+        get_position = self.positions.get
+        for x, y in GENERATORS[self.map_type](self.map_seed, chunk, xs, ys, self.length, self.width):
+            self.spawn(Wall(get_position(x, y), self.mailbox), self.walls)
 
     def is_position_free(self, position):
         """Check if position doesn't contain a blockable entity"""
-        for entities in self.get_entities():
-            if entities and next(iter(entities)).BLOCKABLE:
-                for entity in entities:
-                    if entity.get_position() == position:
-                        return False
-        return True
+        return not self.grid.is_blocked(position)
 
-    async def move_user(self, user, move):
+    def move_user(self, user, move):
         if user.blocked:
             return
 
-        new_position = self.dict_moves[move](user.get_position())
+        position = user.get_position()
+        index = self.geometry.moves[move][position.x * self.width + position.y]
+        # Board edge
+        if index < 0:
+            return
+        new_position = self.positions.at(index)
 
         if self.is_position_free(new_position):
-            self.mailbox.send(user, {Messages.POSITION: new_position})
+            self.mailbox.send(user, Messages.POSITION, new_position)
 
         self.check_explosions(user, new_position)
 
     def check_explosions(self, user, new_position):
-        explosions_positions = {e.get_position(): e for e in self.explosions}
-        if new_position in explosions_positions:
-            self.mailbox.send_to_list(explosions_positions[new_position], Messages.TO_KILL, user)
-            self.mailbox.send(user, {Messages.BLOCKED: True})
-
-    @staticmethod
-    def is_position_valid(position):
-        if position.x < 0 or position.x >= InitValues.LENGTH:
-            return False
-        elif position.y < 0 or position.y >= InitValues.WIDTH:
-            return False
-        return True
+        explosion = self.grid.get_explosion(new_position)
+        if explosion is not None and user not in self.blasted:
+            self.mailbox.send_to_list(explosion, Messages.TO_KILL, (user, explosion.user))
+            self.mailbox.send(user, Messages.BLOCKED, True)
 
     def find_path(self, origin, destination, max_iter=None):
-        class Node:
-            def __init__(self, dest, parent=None, position=None):
-                self.parent = parent
-                self.position = position
-                self.g = parent.g + 1 if parent else 0
-                self.h = pow(self.position.x - dest.x, 2) + pow(self.position.y - dest.y, 2)
-
-            @property
-            def f(self):
-                return self.g + self.h
-
-            def __eq__(self, other):
-                return self.position == other.position
-
-            def get_ancestors(self, ancestors=None):
-                if ancestors is None:
-                    ancestors = []
-                if self.parent is not None:
-                    ancestors.append(self)
-                    return self.parent.get_ancestors(ancestors)
-                ancestors = ancestors[::-1]
-                return [an.position for an in ancestors]
-
-        node_list = []
-        first_node = Node(destination, position=origin)
-        tmp_node_list = [first_node]
-        max_iter = max_iter if max_iter else InitValues.MAX_PATH_ITER
-
-        while len(tmp_node_list) > 0 and max_iter > 0:
-            max_iter -= 1
-            node = min(tmp_node_list, key=(lambda k: k.f))
-            tmp_node_list.remove(node)
-            node_list.append(node)
-            if node.position == destination:
-                return node.get_ancestors()
-
-            adjacent_nodes = []
-            n_pos = node.position
-            # available movements:
-            for new_p in [(0, -1), (0, 1), (-1, 0), (1, 0)]:
-                new_node_pos = Position(n_pos.x + new_p[0], n_pos.y + new_p[1])
-                if self.is_position_valid(new_node_pos) and self.is_position_free(new_node_pos):
-                    adjacent_nodes.append(Node(destination, node, new_node_pos))
-
-            for n in adjacent_nodes:
-                if n not in node_list and (n not in tmp_node_list or node.g > n.g):
-                    tmp_node_list.append(n)
-
-        return (min(node_list, key=(lambda k: k.h))).get_ancestors()
+        """A* path from origin to destination, partial path after max_iter expanded cells"""
+        return self.path_finder.find_path(origin, destination, max_iter if max_iter else InitValues.MAX_PATH_ITER)
+
+    def get_danger_cost(self, index, steps):
+        """Extra path cost of a cell burning when a bot walking from now reaches it"""
+        return self.danger.get_cost(index, steps, to_ticks(Bot.BOT_DELAY), InitValues.DANGER_COST)
+
+    def get_next_step(self, origin, destination):
+        """Next free step toward destination
+
+        Read from the flow field of destination shared by all bots, A* when
+        origin is off that field.
+
+        Returns:
+            Position: next step or None
+        """
+        step = self.flow_fields.get_next_step(origin, destination)
+        if step is None:
+            path = self.find_path(origin, destination)
+            return path[0] if path else None
+        return step if self.is_position_free(step) else None
 
     def random_spawn(self, nb=1):
         """Return nb available positions
@@ -306,149 +575,143 @@ class GameBoard:
         Returns:
             [Position]: positions list
         """
-        # todo need better complexity (only if procedural maps)
-        x_choices = range(InitValues.LENGTH)
-        y_choices = range(InitValues.WIDTH)
-
-        pos_choices = set()
-        for x in x_choices:
-            for y in y_choices:
-                pos_choices.add(Position(x, y))
-
-        blocked_positions = set()
-
-        for entities in self.get_entities():
-            for entity in entities:
-                blocked_positions.add(entity.get_position())
+        return self.grid.random_free(nb, self.random)
 
-        new_pos = pos_choices - blocked_positions
+    def tick(self):
+        """Run one game tick: board messages, entities update, notify and clean
 
-        return random.choices(list(new_pos), k=nb)
-
-    async def game_loop(self):
+        Synchronous, the tick owns the board state: socket handlers only
+        post to the mailbox between ticks.
         """
-        Update and clean all entities and notify users
+        metrics = self.metrics
+        start = time.perf_counter()
+        self.board_update()
+        start = metrics.add_phase("board_update", start)
+        self.entities_update()
+        start = metrics.add_phase("entities_update", start)
+        # Without users (headless games) dirty cells wait for the next notified tick
+        if self.users:
+            message = self.create_message()
+            start = metrics.add_phase("create_message", start)
+            self.notify_map(message)
+            start = metrics.add_phase("notify", start)
+        self.clean_entities()
+        start = metrics.add_phase("clean_entities", start)
+        self.send_logs()
+        metrics.add_phase("send_logs", start)
+        metrics.ticks += 1
+        # Mailbox -> outbox should be empty
+
+    def board_update(self):
+        """Start the tick, handle board messages (booms, moves, bombs) then deliver the tick mail"""
+        self.timers.advance()
+        if self.brain is not None:
+            self.brain.update()
+        self.flush_inputs()
+        self.mailbox.drop_key(EntitiesNames.BOARD)
+        self.blasted.clear()
+        mail = self.mailbox.get(EntitiesNames.BOARD)
+        if mail is not None:
+            if mail.boom:
+                self.detonate(mail.boom)
+                mail.boom.clear()
+            for user, action in mail.move:
+                self.move_user(user, action)
+            mail.move.clear()
+            for user in mail.bomb:
+                self.put_bomb(user)
+            mail.bomb.clear()
+
+        self.mailbox.drop()
+
+    def flush_inputs(self):
+        """Hand the coalesced socket inputs to the board mailbox, one move and one bomb per user"""
+        for user in self.inputs:
+            # Inputs of disconnected users are dropped
+            if user.inputs is not None:
+                user.inputs.flush(user, self.mailbox)
+        self.inputs.clear()
+
+    def entities_update(self):
+        """Run the timers due this tick, then update the entities with mail
+
+        Entities without expiring timers nor mail are not visited.
         """
-        while True:
-            await asyncio.sleep(InitValues.TICKS)
-            # if self.tmp <= 0:
-            #     self.tmp = 1
-            #     all_objects = muppy.get_objects()
-            #     d = [ao for ao in all_objects if isinstance(ao, (User, Entity, Bot, Bomb, Wall, Explosion))]
-            #     sum1 = summary.summarize(d)
-            #     summary.print_(sum1)
-            # else:
-            #     if not self.users:
-            #         self.tmp -= 1
-            #     else:
-            #         self.tmp -= InitValues.TICKS
-            if self.users:
-
-                # Board update DO NOT send messages to board before mailbox.drop()
-                self.mailbox.drop_key(EntitiesNames.BOARD)
-                message_queue = self.mailbox.get(EntitiesNames.BOARD)
-                if message_queue:
-                    tasks = []
-                    if Messages.BOOM in message_queue:
-                        boom_pos_list = message_queue.pop(Messages.BOOM)
-                        tasks += [self.boom(pos) for pos in boom_pos_list]
-                    if Messages.MOVE in message_queue:
-                        move_mess = message_queue.pop(Messages.MOVE)
-                        tasks += [self.move_user(m[0], m[1]) for m in move_mess]
-                    if Messages.BOMB in message_queue:
-                        bomb_mess = message_queue.pop(Messages.BOMB)
-                        tasks += [self.put_bomb(u) for u in bomb_mess]
-                    if tasks:
-                        await asyncio.gather(*tasks)
-
-                self.mailbox.drop()
-
-                # All entities async update
-                entities_task_update = []
-                for entities in self.get_entities():
-                    for entity in entities:
-                        entities_task_update.append(entity.update())
-                await asyncio.gather(*entities_task_update)
-
-                message = self.create_message()
-                if message:
-                    await self.notify(message)
-                await self.clean_entities()
-                await self.send_logs()
-                # Mailbox -> outbox should be empty
-            else:
-                # Waiting users while resting
-                await asyncio.sleep(1)
-
-    async def send_logs(self):
-        logs = self.mailbox.get(EntitiesNames.LOG)
-
-        if not logs:
+        dead = self.dead
+        for entity, callback in self.timers.pop_due():
+            # Timers of entities off the board are dropped
+            if entity.timers is not None:
+                callback()
+                if entity.is_dead():
+                    dead[entity] = None
+        for entity in self.mailbox.delivered:
+            # Mail of entities off the board is dropped
+            if entity.grid is not None:
+                entity.update()
+                if entity.is_dead():
+                    dead[entity] = None
+
+    def send_logs(self):
+        mail = self.mailbox.get(EntitiesNames.LOG)
+        if mail is None or not mail.logs:
             return
 
-        message = {"type": "log"}
-        log_list = []
-        for (k, v) in logs.items():
-            for log in v:
-                log_list.append({k: log})
-
-        message.update({"logs": log_list})
-        map_message = json.dumps(message)
+        message = {"type": "log", "logs": [{mod: log} for mod, log in mail.logs]}
+        mail.logs.clear()
         logging.debug(message)
-        await self.notify(map_message)
+        self.notify(message)
+
+    def clean_entities(self):
+        """Respawn the dead users and bots, remove the other dead entities"""
+        entity_sets = {EntitiesNames.BOMB: self.bombs, EntitiesNames.WALL: self.walls,
+                       EntitiesNames.EXPLOSION: self.explosions}
+        for entity in self.dead:
+            if entity.get_name() == EntitiesNames.USER:
+                self.kill_and_respawn(entity)
+            else:
+                self.despawn(entity, entity_sets[entity.get_name()])
+        self.dead.clear()
 
-    @staticmethod
-    async def clean_entity_list(entity_set, lock):
-        """Remove dead entities
+    def close(self):
+        """Drop the pending work of a closed room"""
+        if self.brain is not None:
+            self.brain.close()
 
-        Args:
-            entity_set (set): entity list to clean
-            lock (async lock): entity lock
-        """
-        async with lock:
-            entity_set -= {e for e in entity_set if e.is_dead()}
-
-    async def clean_entities(self):
-        # todo put that in entity update
-        async with self.users_lock:
-            users_to_kill = {u for u in self.users if u.is_dead()}
-            if users_to_kill:
-                for user in users_to_kill:
-                    self.kill_and_respawn(user)
-
-        async with self.bots_lock:
-            users_to_kill = {u for u in self.bots if u.is_dead()}
-            if users_to_kill:
-                for user in users_to_kill:
-                    self.kill_and_respawn(user)
-
-        await asyncio.gather(
-            self.clean_entity_list(self.bombs, self.bombs_lock),
-            self.clean_entity_list(self.walls, self.walls_lock),
-            self.clean_entity_list(self.explosions, self.explosions_lock),
-        )
+    def is_full(self):
+        return len(self.users) >= InitValues.MAX_USERS
 
     async def game(self, websocket, _):
-        if len(self.users) >= InitValues.MAX_USERS:
+        if self.is_full():
             return
 
         user = User(websocket, self.random_spawn()[0], self.mailbox, self.get_next_mod(), str(uuid1()))
-        await self.register(user)
+        user.protocol = websocket.subprotocol or Protocols.JSON
+        self.register(user)
 
+        inputs = user.inputs = InputQueue()
         try:
-            await websocket.send(self.get_init_state(user.id))
             async for message in websocket:
-                data = json.loads(message)
+                if not inputs.accept(message):
+                    continue
+                try:
+                    data = json.loads(message)
+                except ValueError:
+                    logging.error(f"Unsupported message {message[:64]!r}")
+                    continue
                 logging.debug(f"received: {data}")
-                if "action" in data:
+                if not isinstance(data, dict):
+                    logging.error(f"Unsupported event {message}")
+                elif "action" in data:
                     if data["action"] in Moves.ALL:
-                        self.mailbox.send_to_list(EntitiesNames.BOARD, Messages.MOVE, [user, data["action"]])
+                        if inputs.put_move(data["action"]):
+                            self.inputs.append(user)
                     elif data["action"] == "bomb":
-                        self.mailbox.send_to_list(EntitiesNames.BOARD, Messages.BOMB, user)
+                        if inputs.put_bomb():
+                            self.inputs.append(user)
                     else:
                         logging.error(f"Unsupported data {data}")
                 elif "chat" in data:
-                    self.mailbox.send_to_list(EntitiesNames.LOG, user.mod, data["chat"])
+                    self.mailbox.send_to_list(EntitiesNames.LOG, Messages.LOGS, (user.mod, data["chat"]))
                 else:
                     logging.error(f"Unsupported event {message}")
         except websockets.exceptions.ConnectionClosed:
@@ -457,4 +720,4 @@ class GameBoard:
             logging.exception("Unexpected error")
             raise
         finally:
-            await self.unregister(user)
+            self.unregister(user)
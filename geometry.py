@@ -0,0 +1,87 @@
+from array import array
+
+from constants import Moves, Directions
+
+# Boards up to this many cells get array neighbor tables (built in ~20 ms), larger ones compute neighbors
+MAX_TABLE_CELLS = 1 << 16
+
+
+class _LazyNeighbors:
+    """Neighbor table of one move computed on lookup, huge boards"""
+
+    __slots__ = ("length", "width", "dx", "dy")
+
+    def __init__(self, length, width, dx, dy):
+        self.length = length
+        self.width = width
+        self.dx = dx
+        self.dy = dy
+
+    def __getitem__(self, index):
+        x, y = divmod(index, self.width)
+        x, y = x + self.dx, y + self.dy
+        if 0 <= x < self.length and 0 <= y < self.width:
+            return x * self.width + y
+        return -1
+
+
+class Geometry:
+    """Neighbor and blast ray tables of a board size
+
+    Cells are indexed x * width + y. Moves, paths, flow fields and blasts
+    all read them, so they share one edge policy: no wrap-around, the
+    neighbor of an edge cell off the board is -1 and rays stop at the
+    edges. Built once per size (get_geometry) and shared by the boards of
+    that size.
+    """
+
+    # (dx, dy) of the neighbor tables, in order
+    MOVES = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+    def __init__(self, length, width):
+        self.length = length
+        self.width = width
+        size = length * width
+        if size <= MAX_TABLE_CELLS:
+            none = array("i", [-1])
+            up = array("i", range(-1, size - 1))
+            up[0::width] = none * length
+            down = array("i", range(1, size + 1))
+            down[width - 1::width] = none * length
+            left = array("i", range(-width, size - width))
+            left[:width] = none * width
+            right = array("i", range(width, size + width))
+            right[size - width:] = none * width
+            self.neighbors = (up, down, left, right)
+        else:
+            self.neighbors = tuple(_LazyNeighbors(length, width, dx, dy) for dx, dy in self.MOVES)
+        # {Moves: neighbor table}
+        self.moves = dict(zip((Moves.UP, Moves.DOWN, Moves.LEFT, Moves.RIGHT), self.neighbors))
+
+    def get_rays(self, index):
+        """Blast rays from cell index to the board edges, get_blast order
+
+        Rays are ranges of cell indexes, built in constant time and memory
+        whatever the board size.
+
+        Returns:
+            ((range, str),): (cell indexes from the closest, Directions) of the up, down, left and right rays
+        """
+        width = self.width
+        row = index - index % width
+        return ((range(index - width, -1, -width), Directions.VERTICAL),
+                (range(index + width, self.length * width, width), Directions.VERTICAL),
+                (range(index - 1, row - 1, -1), Directions.HORIZONTAL),
+                (range(index + 1, row + width), Directions.HORIZONTAL))
+
+
+# {(length, width): Geometry}
+_geometries = {}
+
+
+def get_geometry(length, width):
+    """Get the shared geometry of a board size"""
+    geometry = _geometries.get((length, width))
+    if geometry is None:
+        geometry = _geometries[(length, width)] = Geometry(length, width)
+    return geometry
@@ -0,0 +1,104 @@
+import logging
+import time
+
+from constants import EntitiesNames, Messages
+
+
+class InputQueue:
+    """Coalesced inputs of a client, handed to the board once per tick
+
+    Only the latest move and one bomb request are kept between two ticks,
+    key spam costs the board one move whatever the frames count. Frames
+    are rate limited by a token bucket of RATE frames per second and BURST
+    frames, frames over the limit or larger than MAX_FRAME are dropped
+    before parsing.
+    """
+
+    # Bytes (characters for text frames)
+    MAX_FRAME = 1024
+    # Frames per second and bucket size
+    RATE = 30
+    BURST = 60
+
+    __slots__ = ("rate", "burst", "max_frame", "tokens", "updated", "move", "bomb", "pending", "dropped",
+                 "rejected", "_warned")
+
+    def __init__(self, rate=RATE, burst=BURST, max_frame=MAX_FRAME):
+        """
+        Args:
+            rate (float): frames per second refilling the bucket
+            burst (int): bucket size, frames accepted at once
+            max_frame (int): max frame length
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_frame = max_frame
+        self.tokens = burst
+        self.updated = time.monotonic()
+        # Latest move of the tick, None without move
+        self.move = None
+        self.bomb = False
+        # Waiting in the board inputs list
+        self.pending = False
+        # Frames over the rate limit
+        self.dropped = 0
+        # Frames too large
+        self.rejected = 0
+        self._warned = False
+
+    def accept(self, frame):
+        """Check the size and the rate of a received frame, before parsing it
+
+        Returns:
+            bool: True if the frame can be handled
+        """
+        if len(frame) > self.max_frame:
+            self.rejected += 1
+            logging.error(f"Frame of {len(frame)} bytes rejected")
+            return False
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            self.dropped += 1
+            if not self._warned:
+                self._warned = True
+                logging.warning("Client over the input rate limit, frames dropped")
+            return False
+        self.tokens -= 1
+        self._warned = False
+        return True
+
+    def put_move(self, action):
+        """Keep the latest move of the tick
+
+        Returns:
+            bool: True if the queue became pending
+        """
+        self.move = action
+        return self._set_pending()
+
+    def put_bomb(self):
+        """Request a bomb this tick, requests of a same tick are merged
+
+        Returns:
+            bool: True if the queue became pending
+        """
+        self.bomb = True
+        return self._set_pending()
+
+    def _set_pending(self):
+        if self.pending:
+            return False
+        self.pending = True
+        return True
+
+    def flush(self, user, mailbox):
+        """Send the tick inputs of user to the board mailbox, then reset"""
+        if self.move is not None:
+            mailbox.send_to_list(EntitiesNames.BOARD, Messages.MOVE, [user, self.move])
+            self.move = None
+        if self.bomb:
+            mailbox.send_to_list(EntitiesNames.BOARD, Messages.BOMB, user)
+            self.bomb = False
+        self.pending = False
@@ -0,0 +1,129 @@
+import json
+from math import ceil
+
+from constants import Protocols
+from protocol import encode_records, encode_map_records
+
+
+class _ChunkChanges:
+    """Map delta of one chunk, with lazily encoded fragments shared by every view holding it"""
+
+    __slots__ = ("positions", "states", "json", "binary")
+
+    def __init__(self):
+        # Changed cells
+        self.positions = []
+        # {entity name: [state]}
+        self.states = {}
+        # {entity name: JSON list items}
+        self.json = None
+        # {entity name: (records count, records)}
+        self.binary = None
+
+    def get_json(self):
+        if self.json is None:
+            self.json = {name: json.dumps(states)[1:-1] for name, states in self.states.items()}
+        return self.json
+
+    def get_binary(self):
+        if self.binary is None:
+            self.binary = {name: (len(states), encode_records(name, states)) for name, states in self.states.items()}
+        return self.binary
+
+
+class InterestManager:
+    """Area of interest of each user, the map deltas are filtered by view
+
+    A view is the frozenset of the chunks within radius cells of the chunk
+    of the user, users in the same chunk share it. None is the whole board
+    view, used when every view would cover the board. Each tick, the
+    changes are grouped by chunk and encoded once per chunk, the payload of
+    a view joins the fragments of its chunks and is shared by every user of
+    that view.
+    """
+
+    def __init__(self, positions, radius):
+        """
+        Args:
+            positions (PositionTable): interned positions of the board
+            radius (int): view radius in cells, rounded up to whole chunks
+        """
+        self.positions = positions
+        self.radius = ceil(radius / positions.chunk_size)
+        self.whole_board = self.radius >= positions.chunk_rows - 1 and self.radius >= positions.chunk_columns - 1
+        # {center chunk: view}
+        self._views = {}
+        # {user: view} of the last notified map
+        self.views = {}
+        # {chunk: _ChunkChanges} of the tick
+        self.changes = {}
+        # {(view, protocol): payload or None} of the tick
+        self._payloads = {}
+
+    def get_view(self, position):
+        """Get the view of a user standing at position"""
+        if self.whole_board:
+            return None
+        view = self._views.get(position.chunk)
+        if view is None:
+            positions, radius = self.positions, self.radius
+            cx, cy = divmod(position.chunk, positions.chunk_columns)
+            view = self._views[position.chunk] = frozenset(
+                x * positions.chunk_columns + y
+                for x in range(max(cx - radius, 0), min(cx + radius + 1, positions.chunk_rows))
+                for y in range(max(cy - radius, 0), min(cy + radius + 1, positions.chunk_columns)))
+        return view
+
+    def set_changes(self, cell_messages):
+        """Start a tick with its map changes
+
+        Args:
+            cell_messages ([(Position, dict)]): changed cells and their {entity name: [state]}
+        """
+        self.changes = {}
+        self._payloads = {}
+        for position, cell_message in cell_messages:
+            changes = self.changes.get(position.chunk)
+            if changes is None:
+                changes = self.changes[position.chunk] = _ChunkChanges()
+            changes.positions.append(position)
+            for name, states in cell_message.items():
+                changes.states.setdefault(name, []).extend(states)
+
+    def get_states(self, chunks):
+        """Get the tick changes of chunks, as a map message body {entity name: [state]}"""
+        states = {}
+        for chunk in sorted(self.changes.keys() & chunks):
+            for name, chunk_states in self.changes[chunk].states.items():
+                states.setdefault(name, []).extend(chunk_states)
+        return states
+
+    def get_payload(self, view, protocol):
+        """Get the encoded tick map delta of a view
+
+        Returns:
+            str or bytes: map message, None without change in the view
+        """
+        key = (view, protocol)
+        if key not in self._payloads:
+            chunks = [self.changes[chunk] for chunk in sorted(self.changes.keys() & view)]
+            self._payloads[key] = self._encode(chunks, protocol) if chunks else None
+        return self._payloads[key]
+
+    @staticmethod
+    def _encode(chunks, protocol):
+        if protocol == Protocols.BINARY:
+            records = {}
+            for changes in chunks:
+                for name, (count, data) in changes.get_binary().items():
+                    total, parts = records.setdefault(name, (0, []))
+                    parts.append(data)
+                    records[name] = (total + count, parts)
+            return encode_map_records({name: (count, b"".join(parts)) for name, (count, parts) in records.items()})
+
+        fragments = {}
+        for changes in chunks:
+            for name, fragment in changes.get_json().items():
+                fragments.setdefault(name, []).append(fragment)
+        body = ", ".join(f"{json.dumps(name)}: [{', '.join(parts)}]" for name, parts in fragments.items())
+        return f'{{{body}, "type": "map"}}'
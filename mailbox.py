@@ -1,37 +1,189 @@
 import logging
 
+from constants import Messages
+
+# Unset value of a Mail field, None is a valid message value
+NO_MESSAGE = object()
+
+
+class Mail:
+    """Messages of one recipient for one tick
+
+    A field per message kind: single value kinds hold NO_MESSAGE when
+    unset (the last send wins), list kinds are queues reused from tick
+    to tick. Handlers consume a field by resetting (or clearing) it.
+    """
+
+    VALUES = (Messages.POSITION, Messages.BLOCKED, Messages.BOMB_DROPPED, Messages.KILLED, Messages.RESET)
+    QUEUES = (Messages.TO_KILL, Messages.BOOM, Messages.MOVE, Messages.BOMB, Messages.LOGS)
+
+    __slots__ = VALUES + QUEUES + ("owner", "pending")
+
+    def __init__(self, owner):
+        """
+        Args:
+            owner (Entity or str): recipient, for error messages
+        """
+        self.owner = owner
+        # Holds messages not yet taken by MailBox.get
+        self.pending = False
+        for key in self.VALUES:
+            setattr(self, key, NO_MESSAGE)
+        for key in self.QUEUES:
+            setattr(self, key, [])
+
+    def __repr__(self):
+        return f"{self.owner}: {self.get_content()}"
+
+    def get_content(self):
+        """Set message kinds, as a dict"""
+        content = {key: getattr(self, key) for key in self.VALUES if getattr(self, key) is not NO_MESSAGE}
+        content.update({key: getattr(self, key) for key in self.QUEUES if getattr(self, key)})
+        return content
+
+    def is_empty(self):
+        for key in self.VALUES:
+            if getattr(self, key) is not NO_MESSAGE:
+                return False
+        for key in self.QUEUES:
+            if getattr(self, key):
+                return False
+        return True
+
+    def clear(self):
+        self.pending = False
+        for key in self.VALUES:
+            setattr(self, key, NO_MESSAGE)
+        for key in self.QUEUES:
+            getattr(self, key).clear()
+
+    def move_to(self, other):
+        """Move every message into other, other values are overwritten"""
+        for key in self.VALUES:
+            value = getattr(self, key)
+            if value is not NO_MESSAGE:
+                setattr(other, key, value)
+                setattr(self, key, NO_MESSAGE)
+        for key in self.QUEUES:
+            queue = getattr(self, key)
+            if queue:
+                getattr(other, key).extend(queue)
+                queue.clear()
+        self.pending = False
+
 
 class MailBox:
+    """Double buffered tick messages
+
+    Every recipient owns a slot of two preallocated Mail records, one per
+    buffer. Messages sent during a tick go to the inbox records, drop()
+    swaps the buffers and hands the mail to the entities (message_queue)
+    for the next tick, named recipients (board, log) take theirs with
+    get(). Nothing is allocated per message once the slots exist.
+    """
+
+    __slots__ = ("_inbox", "_pending", "_named", "delivered")
+
     def __init__(self):
-        # {entity: {message_key: value}}
-        # {entity: {message_key: []}
-        self.inbox = {}
-        self.outbox = {}
+        # Index of the inbox record in the slots, the outbox is the other one
+        self._inbox = 0
+        # Mail records holding messages, by buffer index
+        self._pending = ([], [])
+        # {recipient name: [Mail, Mail]}, board and log slots
+        self._named = {}
+        # Entities handed mail by the last drop()
+        self.delivered = []
+
+    def _get_inbox(self, recipient):
+        try:
+            slot = recipient.mail_slot
+        except AttributeError:
+            slot = self._named.get(recipient)
+            if slot is None:
+                slot = self._named[recipient] = [Mail(recipient), Mail(recipient)]
+        if slot is None:
+            slot = recipient.mail_slot = [Mail(recipient), Mail(recipient)]
+        mail = slot[self._inbox]
+        if not mail.pending:
+            mail.pending = True
+            self._pending[self._inbox].append(mail)
+        return mail
 
     def drop(self):
-        if self.outbox:
-            logging.error(f"Outbox should be empty: {self.outbox}")
-            self.outbox = {}
-        self.inbox, self.outbox = self.outbox, self.inbox
-
-    def send(self, entity, message):
-        if entity not in self.inbox:
-            self.inbox[entity] = {}
-        self.inbox[entity].update(message)
-
-    def send_to_list(self, entity, key, value):
-        if entity not in self.inbox:
-            self.inbox[entity] = {key: []}
-        elif key not in self.inbox[entity]:
-            self.inbox[entity][key] = []
-        self.inbox[entity][key] += [value]
-
-    def drop_key(self, key):
-        if not self.inbox or key not in self.inbox:
+        """End of the tick, deliver the inbox, it becomes the outbox"""
+        inbox, outbox = self._inbox, 1 - self._inbox
+        # Outbox mail should have been handled during the tick
+        left = [mail for mail in self._pending[outbox] if mail.pending]
+        # Logged before clearing, with their content
+        unhandled = [mail for mail in left if not mail.is_empty()]
+        if unhandled:
+            logging.error(f"Outbox should be empty: {unhandled}")
+        for mail in left:
+            if not isinstance(mail.owner, str):
+                mail.owner.message_queue = None
+            mail.clear()
+        self._pending[outbox].clear()
+
+        self.delivered.clear()
+        for mail in self._pending[inbox]:
+            if mail.pending and not isinstance(mail.owner, str):
+                mail.owner.message_queue = mail
+                self.delivered.append(mail.owner)
+        self._inbox = outbox
+
+    def send(self, recipient, key, value):
+        """Set a single value message, replaces the previous one of the tick
+
+        Args:
+            recipient (Entity or str): entity or EntitiesNames
+            key (str): Messages value kind
+            value: message
+        """
+        setattr(self._get_inbox(recipient), key, value)
+
+    def send_to_list(self, recipient, key, value):
+        """Queue a message
+
+        Args:
+            recipient (Entity or str): entity or EntitiesNames
+            key (str): Messages queue kind
+            value: message
+        """
+        getattr(self._get_inbox(recipient), key).append(value)
+
+    def drop_key(self, recipient):
+        """Deliver the inbox of a named recipient now, without waiting for drop()
+
+        Mail left in the outbox (sent after the previous drop_key) is kept
+        and delivered along.
+        """
+        slot = self._named.get(recipient)
+        if slot is None or not slot[self._inbox].pending:
             return
-        if self.outbox:
-            logging.error(f"Outbox should be empty: {self.outbox}")
-        self.outbox[key] = self.inbox.pop(key)
+        outbox = slot[1 - self._inbox]
+        slot[self._inbox].move_to(outbox)
+        if not outbox.pending:
+            outbox.pending = True
+            self._pending[1 - self._inbox].append(outbox)
+
+    def discard(self, entity):
+        """Drop pending messages of a removed entity"""
+        entity.message_queue = None
+        if entity.mail_slot is not None:
+            entity.mail_slot[0].clear()
+            entity.mail_slot[1].clear()
+
+    def get(self, recipient):
+        """Take the outbox mail of a named recipient
 
-    def get(self, entity):
-        return self.outbox.pop(entity, {})
+        Returns:
+            Mail: to consume, None without mail
+        """
+        slot = self._named.get(recipient)
+        if slot is None:
+            return None
+        mail = slot[1 - self._inbox]
+        if not mail.pending:
+            return None
+        mail.pending = False
+        return mail
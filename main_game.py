@@ -5,7 +5,8 @@ import logging
 import sys
 from logging.handlers import RotatingFileHandler
 
-from game_board import GameBoard
+from metrics import start_metrics_server
+from room_manager import RoomManager
 
 
 def dev_logger():
@@ -18,8 +19,7 @@ def dev_logger():
     logging.getLogger("websockets").setLevel(logging.INFO)
 
 
-def logger():
-    log_name = "/tmp/bomberman.log"
+def logger(log_name="/tmp/bomberman.log"):
     handler = RotatingFileHandler(log_name, maxBytes=5 * 1024 * 1024, backupCount=1)
     logging.basicConfig(level=logging.INFO,
                         handlers=[handler],
@@ -29,6 +29,8 @@ def logger():
 
 IP = "localhost"
 PORT = 5678
+# Prometheus text endpoint, local only
+METRICS_PORT = 9108
 
 
 def main():
@@ -38,11 +40,12 @@ def main():
         logger()
 
     loop = asyncio.get_event_loop()
-    game_board = GameBoard()
-    start_server = game_board.create_server(IP, PORT)
+    room_manager = RoomManager()
+    start_server = room_manager.create_server(IP, PORT)
     try:
         logging.info("Start")
-        loop.create_task(game_board.game_loop())
+        loop.create_task(room_manager.game_loop())
+        loop.run_until_complete(start_metrics_server(room_manager.get_metrics, IP, METRICS_PORT))
         loop.run_until_complete(start_server)
         loop.run_forever()
 
@@ -0,0 +1,124 @@
+"""Seeded procedural wall layouts, generated one chunk at a time
+
+Every generator is a function of (seed, chunk, xs, ys, length, width)
+returning the wall cells (x, y) of the chunk covering the xs, ys ranges of
+a length x width board. The walls of a chunk only depend on the seed and
+the chunk, never on the loading order, so a board can generate its chunks
+lazily and still get the same map.
+"""
+
+import random
+
+from constants import InitValues, MapTypes
+
+# Destructible walls density between the pillars
+CLASSIC_WALLS = 0.3
+# Initial walls density and smoothing steps of the cave automaton
+CAVE_FILL = 0.45
+CAVE_STEPS = 3
+# Walls (including itself) around a cell making it a wall
+CAVE_NEIGHBORS = 5
+# Rooms are chunks, doors width and crates density inside
+ROOM_DOOR = 2
+ROOM_CRATES = 0.05
+
+
+def _get_chunk_random(seed, chunk):
+    return random.Random(f"{seed}:{chunk}")
+
+
+# Random byte -> initial cave wall (1) or open cell (0)
+_CAVE_BYTES = bytes(int(byte < CAVE_FILL * 256) for byte in range(256))
+
+
+def _get_cave_fill(seed, xs, ys, length, width):
+    """Get the initial cave walls of cells xs, ys (may be off board, open)
+
+    Drawn by CHUNK_SIZE blocks of the whole board, each block with its own
+    random generator, whatever the chunk being generated.
+
+    Returns:
+        [bytearray]: rows of 0 or 1
+    """
+    size = InitValues.CHUNK_SIZE
+    blocks = {}
+    rows = []
+    for x in xs:
+        row = bytearray()
+        rows.append(row)
+        if not 0 <= x < length:
+            row.extend(bytes(len(ys)))
+            continue
+        y = ys.start
+        if y < 0:
+            row.extend(bytes(-y))
+            y = 0
+        while y < min(ys.stop, width):
+            key = (x // size, y // size)
+            block = blocks.get(key)
+            if block is None:
+                rng = random.Random(f"{seed}:cave:{key[0]}:{key[1]}")
+                block = blocks[key] = rng.randbytes(size * size).translate(_CAVE_BYTES)
+            end = min((key[1] + 1) * size, ys.stop, width)
+            start = (x % size) * size + y % size
+            row.extend(block[start:start + end - y])
+            y = end
+        row.extend(bytes(ys.stop - max(y, ys.start)))
+    return rows
+
+
+def classic(seed, chunk, xs, ys, length, width):
+    """Pillar on every odd cell, random walls between them"""
+    rng = _get_chunk_random(seed, chunk)
+    walls = []
+    for x in xs:
+        for y in ys:
+            if (x % 2 and y % 2) or rng.random() < CLASSIC_WALLS:
+                walls.append((x, y))
+    return walls
+
+
+def cave(seed, chunk, xs, ys, length, width):
+    """Cellular automaton caves
+
+    The automaton runs on the chunk plus a CAVE_STEPS margin, each step
+    shrinks the exact area by one cell, the chunk edges match its
+    neighbors.
+    """
+    x0, y0 = xs.start - CAVE_STEPS, ys.start - CAVE_STEPS
+    x1, y1 = xs.stop + CAVE_STEPS, ys.stop + CAVE_STEPS
+    rows = _get_cave_fill(seed, range(x0, x1), range(y0, y1), length, width)
+    for _ in range(CAVE_STEPS):
+        smoothed = []
+        for above, row, below in zip(rows, rows[1:], rows[2:]):
+            columns = [a + b + c for a, b, c in zip(above, row, below)]
+            smoothed.append([int(left + center + right >= CAVE_NEIGHBORS)
+                             for left, center, right in zip(columns, columns[1:], columns[2:])])
+        rows = smoothed
+    return [(x, y) for x, row in zip(xs, rows) for y, wall in zip(ys, row) if wall]
+
+
+def rooms(seed, chunk, xs, ys, length, width):
+    """One room per chunk, walled on its first row and column with a door in each, a few crates inside"""
+    rng = _get_chunk_random(seed, chunk)
+    walls = []
+    row_door = rng.randrange(max(len(ys) - ROOM_DOOR, 1))
+    column_door = rng.randrange(max(len(xs) - ROOM_DOOR, 1))
+    for y in ys:
+        if not row_door <= y - ys.start < row_door + ROOM_DOOR:
+            walls.append((xs.start, y))
+    for x in xs[1:]:
+        if not column_door <= x - xs.start < column_door + ROOM_DOOR:
+            walls.append((x, ys.start))
+    for x in xs[1:]:
+        for y in ys[1:]:
+            if rng.random() < ROOM_CRATES:
+                walls.append((x, y))
+    return walls
+
+
+GENERATORS = {
+    MapTypes.CLASSIC: classic,
+    MapTypes.CAVE: cave,
+    MapTypes.ROOMS: rooms,
+}
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import time
+
+PREFIX = "bomberman"
+
+
+class BoardMetrics:
+    """Always-on tick phase timers and message counters of a GameBoard
+
+    Collection is a perf_counter call and two additions per phase, entity
+    counts and sockets are read from the board at scrape time only.
+    """
+
+    PHASES = ["board_update", "entities_update", "create_message", "notify", "clean_entities", "send_logs"]
+
+    def __init__(self):
+        self.phase_seconds = {phase: 0.0 for phase in self.PHASES}
+        self.phase_max = {phase: 0.0 for phase in self.PHASES}
+        self.ticks = 0
+        self.sent_messages = 0
+        self.sent_bytes = 0
+        # Input frames of the disconnected users over the rate limit or too large
+        self.dropped_frames = 0
+        self.rejected_frames = 0
+        # Outbound queues of the disconnected users collapsed into a snapshot
+        self.collapses = 0
+
+    def add_phase(self, phase, start):
+        """Account the time spent in phase since start
+
+        Returns:
+            float: now, start time of the next phase
+        """
+        now = time.perf_counter()
+        elapsed = now - start
+        self.phase_seconds[phase] += elapsed
+        if elapsed > self.phase_max[phase]:
+            self.phase_max[phase] = elapsed
+        return now
+
+    def add_sent(self, message):
+        self.sent_messages += 1
+        self.sent_bytes += len(message)
+
+    def add_inputs(self, inputs):
+        """Account the dropped frames of a closing InputQueue"""
+        self.dropped_frames += inputs.dropped
+        self.rejected_frames += inputs.rejected
+
+    def add_outbound(self, outbound):
+        """Account the collapses of a closing OutboundQueue"""
+        self.collapses += outbound.collapses
+
+    def get_samples(self, board, labels):
+        """Prometheus samples of the board
+
+        Returns:
+            [(name, type, help, labels, value)]
+        """
+        samples = [
+            ("ticks_total", "counter", "Board ticks", labels, self.ticks),
+            ("sent_messages_total", "counter", "Messages sent to sockets", labels, self.sent_messages),
+            ("sent_bytes_total", "counter", "Message bytes (characters for text frames) sent", labels,
+             self.sent_bytes),
+            ("dropped_frames_total", "counter", "Input frames over the rate limit", labels,
+             self.dropped_frames + sum(user.inputs.dropped for user in board.users if user.inputs is not None)),
+            ("rejected_frames_total", "counter", "Input frames over the size limit", labels,
+             self.rejected_frames + sum(user.inputs.rejected for user in board.users if user.inputs is not None)),
+            ("outbound_collapses_total", "counter", "Outbound queues collapsed into a map snapshot", labels,
+             self.collapses + sum(user.outbound.collapses for user in board.users if user.outbound is not None)),
+            ("connected_sockets", "gauge", "Connected websockets", labels,
+             sum(1 for user in board.users if user.ws is not None)),
+            ("flow_fields_computed_total", "counter", "Bot flow fields computed", labels, board.flow_fields.computed),
+        ]
+        for phase in self.PHASES:
+            phase_labels = {**labels, "phase": phase}
+            samples.append(("tick_phase_seconds_total", "counter", "Time spent in tick phases", phase_labels,
+                            self.phase_seconds[phase]))
+            samples.append(("tick_phase_max_seconds", "gauge", "Longest tick phase", phase_labels,
+                            self.phase_max[phase]))
+        for name, entities in (("user", board.users), ("bot", board.bots), ("wall", board.walls),
+                               ("bomb", board.bombs), ("explosion", board.explosions)):
+            samples.append(("entities", "gauge", "Entities on the board", {**labels, "kind": name}, len(entities)))
+        if board.brain is not None:
+            samples.append(("bot_plan_batches_total", "counter", "Bot planning batches sent to the pool", labels,
+                            board.brain.batches))
+            samples.append(("bot_stale_plans_total", "counter", "Bot plans dropped, the bot had moved away", labels,
+                            board.brain.stale))
+        return samples
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+def render(samples):
+    """Render samples in the Prometheus text exposition format
+
+    Args:
+        samples ([(name, type, help, labels, value)]): samples, grouped by name on output
+
+    Returns:
+        str: exposition text
+    """
+    # {name: (type, help, [line])}
+    metrics = {}
+    for name, metric_type, description, labels, value in samples:
+        name = f"{PREFIX}_{name}"
+        if name not in metrics:
+            metrics[name] = (metric_type, description, [])
+        metrics[name][2].append(f"{name}{_format_labels(labels)} {value}")
+
+    lines = []
+    for name, (metric_type, description, metric_lines) in metrics.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.extend(metric_lines)
+    return "\n".join(lines) + "\n"
+
+
+async def start_metrics_server(get_text, host, port):
+    """Serve get_text() as a Prometheus endpoint on the running event loop
+
+    Any GET path answers the metrics, the request body is ignored.
+    """
+
+    async def handle(reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+            if not request.startswith(b"GET "):
+                writer.write(b"HTTP/1.1 405 Method Not Allowed\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            else:
+                body = get_text().encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                             b"Content-Length: %d\r\nConnection: close\r\n\r\n" % len(body) + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            logging.debug("Metrics request dropped")
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
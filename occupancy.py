@@ -0,0 +1,200 @@
+import random
+from array import array
+
+from constants import EntitiesNames
+
+
+class OccupancyGrid:
+    """Per-cell index of the entities living on a board
+
+    Entities are registered when they spawn, re-indexed when they move and
+    removed when the board drops them, so cell queries never scan the
+    entity sets. Only occupied cells are stored. With a loader set, the
+    entities of a chunk (generated walls) are spawned on the first query
+    or spawn touching it.
+    """
+
+    def __init__(self, positions, arrays=None):
+        """
+        Args:
+            positions (PositionTable): interned positions of the board
+            arrays (BoardArrays, optional): array view kept in sync
+        """
+        self.positions = positions
+        self.arrays = arrays
+        self.length = positions.length
+        self.width = positions.width
+        # {position: {entity: None}}, occupied cells only, entities in arrival order
+        self.cells = {}
+        # {entity: position} where the entity is currently indexed
+        self._where = {}
+        # Cells changed since the last map update
+        self.dirty = set()
+        # Static (not MOBILE) blockable entities count by cell index x * width + y (an array, not
+        # scanned by the garbage collector on large boards)
+        self.obstacles = array("i", bytes(4 * self.length * self.width))
+        # Incremented when an obstacle is added, moved or removed
+        self.obstacles_version = 0
+        # Chunk generation function(chunk index), None when the board is fully loaded
+        self.loader = None
+        # Loaded flag by chunk index, chunks are loaded on their first query
+        self.loaded = bytearray(b"\x01") * positions.nb_chunks
+        self.nb_unloaded = 0
+        # DangerMap kept in sync, set by the board
+        self.danger = None
+
+    def __len__(self):
+        return len(self._where)
+
+    def set_loader(self, loader):
+        """Generate the chunks lazily with loader(chunk index), every chunk is unloaded
+
+        Args:
+            loader (function): spawns the entities of a chunk, None to stop lazy loading
+        """
+        self.loader = loader
+        nb_chunks = self.positions.nb_chunks
+        self.loaded = bytearray(nb_chunks) if loader is not None else bytearray(b"\x01") * nb_chunks
+        self.nb_unloaded = nb_chunks if loader is not None else 0
+
+    def load_chunk(self, chunk):
+        if not self.loaded[chunk]:
+            self.loaded[chunk] = 1
+            self.nb_unloaded -= 1
+            self.loader(chunk)
+
+    def load_area(self, position, radius):
+        """Load the chunks within radius cells of position (no wrap-around)"""
+        if not self.nb_unloaded:
+            return
+        positions = self.positions
+        size = positions.chunk_size
+        for cx in range(max(position.x - radius, 0) // size, min(position.x + radius, self.length - 1) // size + 1):
+            for cy in range(max(position.y - radius, 0) // size, min(position.y + radius, self.width - 1) // size + 1):
+                self.load_chunk(cx * positions.chunk_columns + cy)
+
+    def _index(self, entity, position):
+        if not self.loaded[position.chunk]:
+            self.load_chunk(position.chunk)
+        cell = self.cells.get(position)
+        if cell is None:
+            cell = self.cells[position] = {}
+        cell[entity] = None
+        self._where[entity] = position
+        self.dirty.add(position)
+        if entity.BLOCKABLE and not entity.MOBILE:
+            self.obstacles[position.x * self.width + position.y] += 1
+            self.obstacles_version += 1
+        if self.arrays is not None:
+            self.arrays.add(entity, position)
+        if self.danger is not None:
+            self.danger.add(entity, position)
+
+    def _unindex(self, entity):
+        position = self._where.pop(entity)
+        cell = self.cells[position]
+        del cell[entity]
+        if not cell:
+            del self.cells[position]
+        self.dirty.add(position)
+        if entity.BLOCKABLE and not entity.MOBILE:
+            self.obstacles[position.x * self.width + position.y] -= 1
+            self.obstacles_version += 1
+        if self.arrays is not None:
+            self.arrays.remove(entity, position)
+        if self.danger is not None:
+            self.danger.remove(entity, position)
+        return position
+
+    def add(self, entity):
+        """Index a spawning entity at its current position"""
+        if entity in self._where:
+            self.move(entity)
+            return
+        self._index(entity, entity.get_position())
+
+    def remove(self, entity):
+        """Drop an entity from the index, if indexed"""
+        if entity in self._where:
+            self._unindex(entity)
+
+    def move(self, entity):
+        """Re-index an entity after its position changed"""
+        if entity not in self._where:
+            return
+        position = entity.get_position()
+        if self._where[entity] is position:
+            return
+        self._unindex(entity)
+        self._index(entity, position)
+
+    def mark_dirty(self, entity):
+        """Flag the cell of an entity whose state changed"""
+        position = self._where.get(entity)
+        if position is not None:
+            self.dirty.add(position)
+
+    def pop_dirty(self):
+        """Get and reset the cells changed since the last call"""
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def get_entities(self, position):
+        cell = self.cells.get(position)
+        if cell is None:
+            if self.loaded[position.chunk]:
+                return ()
+            self.load_chunk(position.chunk)
+            return self.cells.get(position, ())
+        return cell
+
+    def is_blocked(self, position):
+        """Check if position contains a blockable entity"""
+        return any(entity.BLOCKABLE for entity in self.get_entities(position))
+
+    def is_free(self, position):
+        """Check if position contains no entity at all"""
+        return not self.get_entities(position)
+
+    def get_destructible(self, position):
+        """Get a destructible entity at position or None"""
+        for entity in self.get_entities(position):
+            if entity.DESTRUCTIBLE:
+                return entity
+        return None
+
+    def get_explosion(self, position):
+        """Get an explosion at position or None"""
+        for entity in self.get_entities(position):
+            if entity.EXPLODING:
+                return entity
+        return None
+
+    def get_bombs(self, position):
+        """Get the bombs at position"""
+        return [entity for entity in self.get_entities(position) if entity.get_name() == EntitiesNames.BOMB]
+
+    def random_free(self, nb=1, rng=random):
+        """Draw nb free positions (with replacement)
+
+        Cells are drawn uniformly until free ones are found, the free cells
+        are only listed on a crowded board.
+
+        Returns:
+            [Position]: positions list, empty if the board is full
+        """
+        size = self.length * self.width
+        at = self.positions.at
+        drawn = []
+        attempts = 4 * nb + 16
+        while len(drawn) < nb and attempts:
+            attempts -= 1
+            position = at(rng.randrange(size))
+            if self.is_free(position):
+                drawn.append(position)
+        if len(drawn) < nb:
+            free = [position for position in self.positions if self.is_free(position)]
+            if not free:
+                return []
+            drawn.extend(rng.choices(free, k=nb - len(drawn)))
+        return drawn
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+import websockets
+
+
+class OutboundQueue:
+    """Bounded outbound messages of a client, drained by its own writer task
+
+    The game tick only enqueues. When the queue is full, the queued map
+    deltas are collapsed into one fresh map snapshot; a client still
+    behind after MAX_LAG seconds is disconnected.
+    """
+
+    MAX_SIZE = 64
+    MAX_LAG = 5
+    SLOW_CLIENT_CODE = 1008
+
+    def __init__(self, ws, get_snapshot, max_size=MAX_SIZE, max_lag=MAX_LAG, on_sent=None):
+        """
+        Args:
+            ws (websocket): client websocket
+            get_snapshot (function): full "map" message of the board
+            max_size (int): max queued messages
+            max_lag (float): seconds a full queue is tolerated
+            on_sent (function, optional): called with each sent message
+        """
+        self.ws = ws
+        self.get_snapshot = get_snapshot
+        self.on_sent = on_sent
+        self.max_size = max_size
+        self.max_lag = max_lag
+        # [(collapsible, message)]
+        self.queue = deque()
+        self.ready = asyncio.Event()
+        self.task = None
+        self.behind_since = None
+        self.collapses = 0
+        self.evicted = False
+
+    def start(self):
+        self.task = asyncio.ensure_future(self.run())
+
+    def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.queue.clear()
+
+    def put(self, message, collapsible=False):
+        """Enqueue a message, never waits on the socket
+
+        Args:
+            message (str): message to send
+            collapsible (bool): map delta that a snapshot can replace
+        """
+        if self.evicted:
+            return
+        if len(self.queue) >= self.max_size:
+            now = time.monotonic()
+            if self.behind_since is None:
+                self.behind_since = now
+            elif now - self.behind_since > self.max_lag:
+                self.evict()
+                return
+            self.collapse()
+            if collapsible:
+                # The snapshot already holds this delta
+                self.ready.set()
+                return
+        self.queue.append((collapsible, message))
+        self.ready.set()
+
+    def collapse(self):
+        """Replace the queued map deltas with a fresh map snapshot"""
+        self.collapses += 1
+        kept = deque(item for item in self.queue if not item[0])
+        kept.append((True, self.get_snapshot()))
+        self.queue = kept
+
+    def evict(self):
+        logging.warning(f"Slow client {self.ws.remote_address} evicted")
+        self.evicted = True
+        self.close()
+        asyncio.ensure_future(self.ws.close(self.SLOW_CLIENT_CODE, "Client too slow"))
+
+    async def run(self):
+        """Writer task, send queued messages in order"""
+        try:
+            while True:
+                await self.ready.wait()
+                self.ready.clear()
+                while self.queue:
+                    _, message = self.queue.popleft()
+                    await self.ws.send(message)
+                    if self.on_sent is not None:
+                        self.on_sent(message)
+                self.behind_since = None
+        except websockets.exceptions.ConnectionClosed:
+            logging.debug("Connection lost")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logging.exception("Connection lost for unexpected reasons :")
@@ -0,0 +1,114 @@
+from array import array
+from heapq import heappush, heappop
+
+from geometry import get_geometry
+
+
+class PathFinder:
+    """A* search on a board grid with reusable search buffers
+
+    Cells are indexed x * width + y. Per cell buffers are allocated once per
+    board, a search stamp marks which entries belong to the running search
+    so nothing is cleared between searches.
+    """
+
+    def __init__(self, positions, is_blocked, get_cost=None):
+        """
+        Args:
+            positions (PositionTable): interned positions of the board
+            is_blocked (function): Position -> bool, cell holds a blockable entity
+            get_cost (function, optional): (cell index, steps to the cell) -> extra cost of entering it
+        """
+        self.positions = positions
+        self.length = positions.length
+        self.width = positions.width
+        self.is_blocked = is_blocked
+        self.get_cost = get_cost
+        # Neighbor tables of the board size, no wrap-around
+        self.neighbors = get_geometry(self.length, self.width).neighbors
+        size = self.length * self.width
+        # Int arrays, not scanned by the garbage collector on large boards
+        # Path cost, steps count (cost without the extra costs)
+        self._g = array("i", bytes(4 * size))
+        self._steps = array("i", bytes(4 * size))
+        self._parent = array("i", [-1]) * size
+        # Cell seen (open or closed) / closed during search number _search
+        self._seen = array("i", bytes(4 * size))
+        self._closed = array("i", bytes(4 * size))
+        self._search = 0
+        self._heap = []
+
+    def _get_path(self, index):
+        path = []
+        parent, at = self._parent, self.positions.at
+        while parent[index] != -1:
+            path.append(at(index))
+            index = parent[index]
+        path.reverse()
+        return path
+
+    def find_path(self, origin, destination, max_iter):
+        """Find a path from origin to destination
+
+        Args:
+            origin (Position): start position, not part of the path
+            destination (Position): end position
+            max_iter (int): max expanded cells
+
+        Returns:
+            [Position]: path to destination, or to the expanded cell closest
+                to destination if not reached in max_iter
+        """
+        self._search += 1
+        search = self._search
+        width, neighbors = self.width, self.neighbors
+        g, steps, parent, seen, closed = self._g, self._steps, self._parent, self._seen, self._closed
+        at, is_blocked, get_cost = self.positions.at, self.is_blocked, self.get_cost
+        dest_x, dest_y = destination.x, destination.y
+        heap = self._heap
+        heap.clear()
+
+        start = origin.x * width + origin.y
+        g[start] = 0
+        steps[start] = 0
+        parent[start] = -1
+        seen[start] = search
+        h = abs(origin.x - dest_x) + abs(origin.y - dest_y)
+        best, best_h = start, h
+        # (f, h, insertion counter, cell index), the counter keeps ties FIFO
+        counter = 0
+        heappush(heap, (h, h, counter, start))
+
+        while heap and max_iter > 0:
+            _, h, _, index = heappop(heap)
+            if closed[index] == search:
+                continue
+            closed[index] = search
+            max_iter -= 1
+            if h < best_h:
+                best, best_h = index, h
+            if h == 0:
+                return self._get_path(index)
+
+            new_steps = steps[index] + 1
+            for table in neighbors:
+                neighbor = table[index]
+                if neighbor < 0 or closed[neighbor] == search:
+                    continue
+                new_g = g[index] + 1
+                if get_cost is not None:
+                    new_g += get_cost(neighbor, new_steps)
+                if seen[neighbor] == search and g[neighbor] <= new_g:
+                    continue
+                if is_blocked(at(neighbor)):
+                    continue
+                seen[neighbor] = search
+                g[neighbor] = new_g
+                steps[neighbor] = new_steps
+                parent[neighbor] = index
+                nx, ny = divmod(neighbor, width)
+                nh = abs(nx - dest_x) + abs(ny - dest_y)
+                counter += 1
+                heappush(heap, (new_g + nh, nh, counter, neighbor))
+
+        return self._get_path(best)
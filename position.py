@@ -1,8 +1,21 @@
+from constants import InitValues
+
+
 class Position:
-    
-    def __init__(self, x: int, y: int):
+    """Board cell coordinates
+
+    Positions are interned by the PositionTable of their board, one object
+    per cell: equality and hashing are identity, never create them directly
+    for a board lookup.
+    """
+
+    __slots__ = ("x", "y", "chunk")
+
+    def __init__(self, x: int, y: int, chunk: int = 0):
         self.x = x
         self.y = y
+        # Index of the board chunk holding the cell
+        self.chunk = chunk
 
     @property
     def position(self):
@@ -15,11 +28,78 @@ class Position:
     def __str__(self) -> str:
         return f"<{self.x}, {self.y}>"
 
-    def __eq__(self, other):
-        return self.y == other.y and self.x == other.x
+    def __repr__(self) -> str:
+        return str(self)
 
     def __gt__(self, other):
         return self.x > other.x or (self.x == other.x and self.y > other.y)
 
-    def __hash__(self):
-        return hash((self.x, self.y))
+
+class PositionTable:
+    """Interned positions of a board, cell index x * width + y
+
+    The board is split in square chunks of chunk_size cells, numbered
+    row by row (chunk index cx * chunk_columns + cy). Positions are created
+    a whole chunk at a time on first access, a large board only pays for
+    the chunks in use.
+    """
+
+    __slots__ = ("length", "width", "chunk_size", "chunk_rows", "chunk_columns", "cells")
+
+    def __init__(self, length, width, chunk_size=InitValues.CHUNK_SIZE):
+        self.length = length
+        self.width = width
+        self.chunk_size = chunk_size
+        self.chunk_rows = -(-length // chunk_size)
+        self.chunk_columns = -(-width // chunk_size)
+        # {cell index: Position} of the created chunks, a dict is only as large as the chunks in use
+        self.cells = {}
+
+    def __len__(self):
+        return self.length * self.width
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.at(index)
+
+    @property
+    def nb_chunks(self):
+        return self.chunk_rows * self.chunk_columns
+
+    def get_chunk(self, x, y):
+        """Get the index of the chunk holding cell (x, y)"""
+        return (x // self.chunk_size) * self.chunk_columns + y // self.chunk_size
+
+    def get_chunk_bounds(self, chunk):
+        """Get the cells of a chunk
+
+        Returns:
+            (range, range): x and y ranges
+        """
+        cx, cy = divmod(chunk, self.chunk_columns)
+        size = self.chunk_size
+        return (range(cx * size, min((cx + 1) * size, self.length)),
+                range(cy * size, min((cy + 1) * size, self.width)))
+
+    def _create_chunk(self, chunk):
+        cells, width = self.cells, self.width
+        xs, ys = self.get_chunk_bounds(chunk)
+        for x in xs:
+            row = x * width
+            for y in ys:
+                cells[row + y] = Position(x, y, chunk)
+
+    def get(self, x, y):
+        """Get the position of cell (x, y), which must be on the board"""
+        position = self.cells.get(x * self.width + y)
+        if position is None:
+            self._create_chunk(self.get_chunk(x, y))
+            position = self.cells[x * self.width + y]
+        return position
+
+    def at(self, index):
+        """Get the position of cell index x * width + y"""
+        position = self.cells.get(index)
+        if position is None:
+            return self.get(*divmod(index, self.width))
+        return position
@@ -0,0 +1,119 @@
+import json
+import struct
+
+from constants import EntitiesNames, Protocols, Directions
+
+MAP = 1
+
+_HEADER = struct.Struct("<BB")
+_KIND_HEADER = struct.Struct("<BI")
+_DIRECTIONS = {Directions.ALL: 0, Directions.VERTICAL: 1, Directions.HORIZONTAL: 2}
+_DIRECTION_NAMES = {value: name for name, value in _DIRECTIONS.items()}
+
+
+def _flags(state):
+    return state["dead"]
+
+
+def _user_flags(state):
+    return state["dead"] | state["can_drop"] << 1
+
+
+# {entity name: (kind id, record struct, state -> record values, record values -> state)}
+# Records always start with x, y (uint16) and a flags byte (bit 0: dead)
+_KINDS = {
+    EntitiesNames.ENTITY: (0, struct.Struct("<HH"), lambda s: (s["x"], s["y"]), lambda v: {
+        "x": v[0], "y": v[1], "dead": False}),
+    EntitiesNames.USER: (1, struct.Struct("<HHBBIIII"), lambda s: (
+        s["x"], s["y"], _user_flags(s), s["mod"], s["uid"], s["deaths"], s["killed"], s["suicides"]), lambda v: {
+        "x": v[0], "y": v[1], "dead": bool(v[2] & 1), "can_drop": bool(v[2] & 2), "mod": v[3], "uid": v[4],
+        "deaths": v[5], "killed": v[6], "suicides": v[7]}),
+    EntitiesNames.WALL: (2, struct.Struct("<HHBb"), lambda s: (
+        s["x"], s["y"], _flags(s), -1 if s["wall_state"] is None else s["wall_state"]), lambda v: {
+        "x": v[0], "y": v[1], "dead": bool(v[2] & 1), "wall_state": None if v[3] == -1 else v[3]}),
+    EntitiesNames.BOMB: (3, struct.Struct("<HHBB"), lambda s: (s["x"], s["y"], _flags(s), s["bomb_state"]), lambda v: {
+        "x": v[0], "y": v[1], "dead": bool(v[2] & 1), "bomb_state": v[3]}),
+    EntitiesNames.EXPLOSION: (4, struct.Struct("<HHBBB"), lambda s: (
+        s["x"], s["y"], _flags(s), s["explosion_state"], _DIRECTIONS[s["direction"]]), lambda v: {
+        "x": v[0], "y": v[1], "dead": bool(v[2] & 1), "explosion_state": v[3], "direction": _DIRECTION_NAMES[v[4]]}),
+}
+# {kind id: entity name}
+_NAMES = {kind[0]: name for name, kind in _KINDS.items()}
+
+
+def encode_map(message):
+    """Encode a map message to the binary protocol
+
+    Layout (little endian): type uint8, kinds count uint8, then per kind
+    kind id uint8, records count uint32 and the fixed size records.
+
+    Args:
+        message (dict): {"type": "map", entity name: [state]}
+
+    Returns:
+        bytes: encoded message
+    """
+    return encode_map_records({
+        name: (len(states), encode_records(name, states)) for name, states in message.items() if name != "type"
+    })
+
+
+def encode_records(name, states):
+    """Encode the states of an entity kind as binary records, without kind header"""
+    _, record, values, _ = _KINDS[name]
+    return b"".join(record.pack(*values(state)) for state in states)
+
+
+def encode_map_records(records):
+    """Encode a binary map message from already encoded records
+
+    Args:
+        records (dict): {entity name: (records count, records bytes)}
+
+    Returns:
+        bytes: encoded message
+    """
+    chunks = [_HEADER.pack(MAP, len(records))]
+    for name, (count, data) in records.items():
+        chunks.append(_KIND_HEADER.pack(_KINDS[name][0], count))
+        chunks.append(data)
+    return b"".join(chunks)
+
+
+def decode_map(data):
+    """Decode a binary map message, same as the web client
+
+    Args:
+        data (bytes): encoded message
+
+    Returns:
+        dict: {"type": "map", entity name: [state]}, states hold the encoded fields only
+    """
+    message_type, kinds = _HEADER.unpack_from(data)
+    message = {"type": "map"}
+    if message_type != MAP:
+        return message
+    offset = _HEADER.size
+    for _ in range(kinds):
+        kind, count = _KIND_HEADER.unpack_from(data, offset)
+        offset += _KIND_HEADER.size
+        name = _NAMES[kind]
+        _, record, _, state = _KINDS[name]
+        message[name] = [state(values) for values in record.iter_unpack(data[offset:offset + count * record.size])]
+        offset += count * record.size
+    return message
+
+
+def encode(message, protocol):
+    """Encode a message for a client protocol, only map messages have a binary form
+
+    Args:
+        message (dict): message with a "type" key
+        protocol (str): Protocols value
+
+    Returns:
+        str or bytes: encoded message
+    """
+    if protocol == Protocols.BINARY and message["type"] == "map":
+        return encode_map(message)
+    return json.dumps(message)
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import websockets
+
+from constants import InitValues, Protocols
+from game_board import GameBoard
+from inbound import InputQueue
+from metrics import render
+from scheduler import TickScheduler
+
+
+class RoomStats:
+    """Tick time accounting of a room"""
+
+    def __init__(self):
+        self.created = time.monotonic()
+        self.ticks = 0
+        self.total_time = 0
+        self.max_time = 0
+        self.last_time = 0
+
+    def add(self, tick_time):
+        self.ticks += 1
+        self.total_time += tick_time
+        self.last_time = tick_time
+        if tick_time > self.max_time:
+            self.max_time = tick_time
+
+    def get_state(self):
+        return {
+            "ticks": self.ticks,
+            "total_time": self.total_time,
+            "mean_time": self.total_time / self.ticks if self.ticks else 0,
+            "max_time": self.max_time,
+            "last_time": self.last_time,
+            "uptime": time.monotonic() - self.created,
+        }
+
+
+class RoomManager:
+    """Route websockets to GameBoard rooms and tick every room from one loop
+
+    The room is the first path segment or the `room` query parameter
+    (`/my_room`, `/?room=my_room`), connections without room join the first
+    public room with a free slot. Public room names are generated, clients
+    cannot request them.
+    """
+
+    PUBLIC_ROOM = "public"
+    ROOM_NAME = re.compile(r"^[\w-]{1,32}$")
+    PUBLIC_ROOM_NAME = re.compile(rf"^{PUBLIC_ROOM}-\d+$")
+    # Close code of the sockets of a crashed room
+    ROOM_ERROR_CODE = 1011
+
+    def __init__(self):
+        # {name: GameBoard}
+        self.rooms = {}
+        # {name: RoomStats}
+        self.stats = {}
+        # {name: GameBoard} of the public rooms, in creation order
+        self.public_rooms = {}
+        self._public_rooms = 0
+        # Bot path planning of every room, off the tick
+        self.bot_executor = ThreadPoolExecutor(InitValues.BOT_WORKERS, thread_name_prefix="bot")
+        self.scheduler = TickScheduler(self.tick, is_idle=lambda: not self.rooms)
+
+    def create_server(self, ip, port):
+        # Larger frames are refused by the websocket layer, before buffering them
+        return websockets.serve(self.game, ip, port, subprotocols=Protocols.ALL, max_size=InputQueue.MAX_FRAME)
+
+    @classmethod
+    def get_room_name(cls, path):
+        """Get the requested room name from the websocket path
+
+        Returns:
+            str: room name or None for public matchmaking
+        """
+        url = urlsplit(path or "/")
+        name = parse_qs(url.query).get("room", [None])[0]
+        if name is None:
+            name = url.path.strip("/").split("/")[0] or None
+        if name is not None and not cls.ROOM_NAME.match(name):
+            logging.error(f"Unsupported room name {name}")
+            return None
+        if name is not None and cls.PUBLIC_ROOM_NAME.match(name):
+            logging.error(f"Reserved room name {name}")
+            return None
+        return name
+
+    def get_room(self, name):
+        """Get or create a room, public matchmaking if name is None"""
+        public = name is None
+        if public:
+            for room_name, room in self.public_rooms.items():
+                if not room.is_full():
+                    return room_name, room
+            self._public_rooms += 1
+            name = f"{self.PUBLIC_ROOM}-{self._public_rooms}"
+
+        if name not in self.rooms:
+            logging.info(f"Room {name} created")
+            self.rooms[name] = GameBoard(bot_executor=self.bot_executor)
+            self.stats[name] = RoomStats()
+            if public:
+                self.public_rooms[name] = self.rooms[name]
+        return name, self.rooms[name]
+
+    def close_room(self, name):
+        room = self.rooms.pop(name, None)
+        self.public_rooms.pop(name, None)
+        if room is not None:
+            room.close()
+        stats = self.stats.pop(name, None)
+        if stats is not None:
+            logging.info(f"Room {name} closed {stats.get_state()}")
+
+    def get_public_slots(self):
+        """Free slots of the public rooms, players joining by matchmaking"""
+        return sum(max(InitValues.MAX_USERS - len(room.users), 0) for room in self.public_rooms.values())
+
+    def get_state(self):
+        """Per room users count and tick times"""
+        return {
+            name: {"users": len(room.users), "bots": len(room.bots), **self.stats[name].get_state()}
+            for name, room in self.rooms.items()
+        }
+
+    def get_metrics(self):
+        """Prometheus text of the scheduler and of every room"""
+        samples = [("rooms", "gauge", "Open rooms", {}, len(self.rooms))]
+        for name, value in self.scheduler.get_state().items():
+            samples.append((f"scheduler_{name}_total", "counter", f"Shared loop {name.replace('_', ' ')}", {}, value))
+        for name, room in self.rooms.items():
+            labels = {"room": name}
+            stats = self.stats[name]
+            samples.append(("room_tick_seconds_total", "counter", "Room tick time", labels, stats.total_time))
+            samples.append(("room_tick_max_seconds", "gauge", "Longest room tick", labels, stats.max_time))
+            samples.extend(room.metrics.get_samples(room, labels))
+        return render(samples)
+
+    async def game(self, websocket, path):
+        name, room = self.get_room(self.get_room_name(path))
+        if room.is_full():
+            await websocket.close(1013, "Room is full")
+            return
+
+        try:
+            await room.game(websocket, path)
+        finally:
+            if self.rooms.get(name) is room and not room.users:
+                self.close_room(name)
+
+    def tick(self):
+        """Tick every room with users, accounting each room tick time
+
+        A room whose tick raises is closed, the other rooms keep ticking.
+        """
+        for name, room in list(self.rooms.items()):
+            if not room.users:
+                continue
+            stats = self.stats[name]
+            start = time.perf_counter()
+            try:
+                room.tick()
+            except Exception:
+                logging.exception(f"Room {name} tick failed, closing it")
+                self.fail_room(name, room)
+                continue
+            stats.add(time.perf_counter() - start)
+
+    def fail_room(self, name, room):
+        """Close a crashed room and the sockets of its users, they can join another room"""
+        self.close_room(name)
+        for user in room.users:
+            if user.ws is not None:
+                asyncio.ensure_future(user.ws.close(self.ROOM_ERROR_CODE, "Room error"))
+
+    async def game_loop(self):
+        """
+        Shared game loop of all rooms
+        """
+        await self.scheduler.run()
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import time
+
+from constants import InitValues
+
+
+class TickScheduler:
+    """Deadline based fixed timestep loop
+
+    Each tick is due `period` seconds after the previous deadline, the loop
+    only sleeps the time left until that deadline. When ticks overrun, the
+    missed ticks are run back to back up to `max_catch_up`, any tick past
+    that cap is skipped.
+    """
+
+    IDLE_PERIOD = 1
+
+    def __init__(self, tick, period=InitValues.TICKS, max_catch_up=InitValues.MAX_CATCH_UP_TICKS,
+                 is_idle=None, clock=time.monotonic):
+        """
+        Args:
+            tick (function): one game tick
+            period (float): tick period in seconds
+            max_catch_up (int): max extra ticks run after an overrun
+            is_idle (function, optional): skip ticks (resting) while True
+            clock (function): monotonic clock
+        """
+        self.tick = tick
+        self.period = period
+        self.max_catch_up = max_catch_up
+        self.is_idle = is_idle
+        self.clock = clock
+        self.deadline = None
+        self.ticks = 0
+        self.late_ticks = 0
+        self.skipped_ticks = 0
+
+    def get_state(self):
+        return {"ticks": self.ticks, "late_ticks": self.late_ticks, "skipped_ticks": self.skipped_ticks}
+
+    def run_due(self):
+        """Run every tick due at the current time
+
+        Returns:
+            int: number of ticks run
+        """
+        behind = int((self.clock() - self.deadline) / self.period)
+        if behind > self.max_catch_up:
+            skipped = behind - self.max_catch_up
+            self.skipped_ticks += skipped
+            self.deadline += skipped * self.period
+            behind = self.max_catch_up
+            logging.warning(f"Tick overrun, {skipped} ticks skipped")
+        self.late_ticks += behind
+
+        for _ in range(behind + 1):
+            self.tick()
+            self.ticks += 1
+            self.deadline += self.period
+        return behind + 1
+
+    async def run(self):
+        self.deadline = self.clock() + self.period
+        while True:
+            if self.is_idle is not None and self.is_idle():
+                # Waiting users while resting
+                await asyncio.sleep(self.IDLE_PERIOD)
+                self.deadline = self.clock() + self.period
+                continue
+
+            delay = self.deadline - self.clock()
+            # Always yield so sockets are served between catch-up bursts
+            await asyncio.sleep(max(delay, 0))
+            self.run_due()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""Headless bot-vs-bot simulation
+
+Runs a GameBoard with Bot players only, no sockets and no sleep between
+ticks, then prints ticks/sec and the bots scores.
+
+Usage:
+    python simulation.py [--seed 0] [--bots 4] [--ticks 10000] [--size 10 10] [--walls 20] [--arrays]
+                         [--map random] [--bot-workers 0] [--bot-processes]
+"""
+
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from constants import InitValues, MapTypes
+from game_board import GameBoard
+
+
+def simulate(board, ticks):
+    for _ in range(ticks):
+        board.tick()
+
+
+def run_match(seed=0, bots=4, ticks=10000, length=InitValues.LENGTH, width=InitValues.WIDTH,
+              walls=InitValues.WALLS, arrays=False, map_type=MapTypes.RANDOM, bot_executor=None):
+    """Run a headless match as fast as possible
+
+    Bots planning in a bot_executor pool make the match depend on the
+    pool timing, it is only reproducible without.
+
+    Returns:
+        dict: ticks, elapsed time, ticks per second, speedup over real time and bots scores
+    """
+    # Module random is used by nothing on the board, seeded anyway for user code
+    random.seed(seed)
+    board = GameBoard(length, width, walls, seed=seed, arrays=arrays, map_type=map_type,
+                      bot_executor=bot_executor, bot_bombs=True)
+    for _ in range(bots):
+        board.add_bot()
+
+    start = time.perf_counter()
+    simulate(board, ticks)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "seed": seed,
+        "ticks": ticks,
+        "elapsed": elapsed,
+        "ticks_per_sec": ticks / elapsed,
+        "speedup": ticks * InitValues.TICKS / elapsed,
+        "scores": sorted(
+            ({"uid": bot.uid, "mod": bot.mod, "killed": bot.nb_kill, "deaths": bot.nb_death,
+              "suicides": bot.nb_suicide} for bot in board.bots),
+            key=lambda score: score["uid"]),
+    }
+
+
+def print_summary(summary):
+    print(f"seed {summary['seed']}: {summary['ticks']} ticks in {summary['elapsed']:.2f}s, "
+          f"{summary['ticks_per_sec']:.0f} ticks/s, x{summary['speedup']:.0f} real time")
+    print(f"{'bot':>5} {'mod':>4} {'killed':>7} {'deaths':>7} {'suicides':>9}")
+    for score in summary["scores"]:
+        print(f"{score['uid']:>5} {score['mod']:>4} {score['killed']:>7} {score['deaths']:>7} {score['suicides']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bots", type=int, default=4)
+    parser.add_argument("--ticks", type=int, default=10000)
+    parser.add_argument("--size", type=int, nargs=2, default=[InitValues.LENGTH, InitValues.WIDTH],
+                        metavar=("LENGTH", "WIDTH"))
+    parser.add_argument("--walls", type=int, default=InitValues.WALLS)
+    parser.add_argument("--arrays", action="store_true", help="NumPy board arrays (vectorized blasts)")
+    parser.add_argument("--map", choices=MapTypes.ALL, default=MapTypes.RANDOM, help="walls layout")
+    parser.add_argument("--bot-workers", type=int, default=0, help="off tick bot planning pool size")
+    parser.add_argument("--bot-processes", action="store_true", help="process pool instead of threads")
+    args = parser.parse_args()
+
+    bot_executor = None
+    if args.bot_workers:
+        pool = ProcessPoolExecutor if args.bot_processes else ThreadPoolExecutor
+        bot_executor = pool(args.bot_workers)
+    print_summary(run_match(args.seed, args.bots, args.ticks, args.size[0], args.size[1], args.walls,
+                            args.arrays, args.map, bot_executor))
+    if bot_executor is not None:
+        bot_executor.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    main()
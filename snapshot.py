@@ -0,0 +1,117 @@
+import json
+
+from constants import EntitiesNames, Protocols
+from protocol import encode_records, encode_map_records
+
+
+class _CellStates:
+    """States of one entity kind in one cell, with lazily encoded fragments"""
+
+    __slots__ = ("states", "json", "binary")
+
+    def __init__(self, states):
+        self.states = states
+        self.json = None
+        self.binary = None
+
+    def get_json(self):
+        if self.json is None:
+            # Items of the JSON list, without brackets
+            self.json = json.dumps(self.states)[1:-1]
+        return self.json
+
+    def get_binary(self, name):
+        if self.binary is None:
+            self.binary = encode_records(name, self.states)
+        return self.binary
+
+
+class WorldSnapshot:
+    """Versioned, pre-encoded world state
+
+    Updated with the per cell map delta every tick, each cell keeps its
+    encoded fragments until it changes. Full payloads (init body, map
+    snapshots) are joined from the fragments once per version and view,
+    and shared by every joiner of that version and view.
+    """
+
+    def __init__(self):
+        self.version = 0
+        # {entity name: {position: _CellStates}}
+        self.cells = {}
+        # {payload key: payload} of the current version
+        self._cache = {}
+
+    def update(self, position, message):
+        """Replace a cell content
+
+        Args:
+            position (Position): cell position
+            message (dict): {entity name: [state]} of the cell
+        """
+        for kind_cells in self.cells.values():
+            kind_cells.pop(position, None)
+        for name, states in message.items():
+            self.cells.setdefault(name, {})[position] = _CellStates(states)
+
+    def commit(self):
+        """Start a new version, drop the payloads of the previous one"""
+        self.version += 1
+        self._cache = {}
+
+    def _get_payload(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    @staticmethod
+    def _get_cells(kind_cells, view):
+        if view is None:
+            return kind_cells.values()
+        return [cell for position, cell in kind_cells.items() if position.chunk in view]
+
+    def _build_json_body(self, names, view):
+        parts = []
+        for name in names:
+            fragments = [cell.get_json() for cell in self._get_cells(self.cells[name], view)]
+            if fragments:
+                parts.append(f"{json.dumps(name)}: [{', '.join(fragments)}]")
+        return ", ".join(parts)
+
+    def _build_binary_map(self, view):
+        records = {}
+        for name, kind_cells in self.cells.items():
+            cells = self._get_cells(kind_cells, view)
+            if cells:
+                records[name] = (
+                    sum(len(cell.states) for cell in cells),
+                    b"".join(cell.get_binary(name) for cell in cells),
+                )
+        return encode_map_records(records)
+
+    def get_init_body(self, view=None):
+        """JSON members of every entity state, without grass cells
+
+        Args:
+            view (frozenset, optional): chunks to include, the whole board if None
+
+        Returns:
+            str: '"user": [...], "wall": [...]' or empty string
+        """
+        names = [name for name in self.cells if name != EntitiesNames.ENTITY]
+        return self._get_payload(("init", view), lambda: self._build_json_body(names, view))
+
+    def get_map(self, protocol=Protocols.JSON, view=None):
+        """Full map message, grass cells included
+
+        Args:
+            view (frozenset, optional): chunks to include, the whole board if None
+        """
+        if protocol == Protocols.BINARY:
+            return self._get_payload((protocol, view), lambda: self._build_binary_map(view))
+
+        def build():
+            body = self._build_json_body(list(self.cells), view)
+            return f'{{{body}, "type": "map"}}' if body else '{"type": "map"}'
+
+        return self._get_payload((protocol, view), build)
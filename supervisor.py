@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+"""Multi-process server, one RoomManager per worker process
+
+The supervisor listens on the public port and routes each websocket to a
+worker from its upgrade request path: a named room always goes to the same
+worker (hash of the name), public matchmaking goes to a worker with a free
+public room slot, the least loaded worker if none. Crashed workers are restarted. The control socket answers every
+connection with the workers state as JSON.
+
+Usage:
+    python supervisor.py [-d] [--workers N] [--control /tmp/bomberman.sock]
+    echo | nc -U /tmp/bomberman.sock
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import time
+import zlib
+
+from constants import InitValues
+from main_game import IP, PORT, METRICS_PORT, dev_logger, logger
+from metrics import start_metrics_server
+from room_manager import RoomManager
+
+# Workers only listen locally, worker i on WORKER_PORT + i
+LOCAL_IP = "127.0.0.1"
+WORKER_PORT = 15678
+CONTROL_PATH = "/tmp/bomberman.sock"
+# Seconds between worker load reports and liveness checks
+LOAD_INTERVAL = 1
+# Seconds before restarting a crashed worker
+RESTART_DELAY = 1
+# Upgrade request max bytes and seconds to receive it
+MAX_HEADER = 8192
+HEADER_TIMEOUT = 5
+PIPE_BUFFER = 65536
+
+
+def get_load(room_manager):
+    """Load report of a worker: rooms, users and tick time share"""
+    rooms = room_manager.get_state()
+    return {
+        "rooms": len(rooms),
+        "users": sum(room["users"] for room in rooms.values()),
+        "bots": sum(room["bots"] for room in rooms.values()),
+        "public_slots": room_manager.get_public_slots(),
+        # Part of the tick period spent ticking the rooms
+        "busy": sum(room["last_time"] for room in rooms.values()) / InitValues.TICKS,
+        **room_manager.scheduler.get_state(),
+    }
+
+
+async def report_load(room_manager, conn):
+    while True:
+        conn.send(get_load(room_manager))
+        await asyncio.sleep(LOAD_INTERVAL)
+
+
+def run_worker(index, port, metrics_port, conn, debug):
+    """Worker process: a RoomManager on a local port, reporting its load to conn"""
+    if debug:
+        dev_logger()
+    else:
+        logger(f"/tmp/bomberman-{index}.log")
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    room_manager = RoomManager()
+    try:
+        logging.info(f"Worker {index} start")
+        loop.create_task(room_manager.game_loop())
+        loop.create_task(report_load(room_manager, conn))
+        loop.run_until_complete(start_metrics_server(room_manager.get_metrics, LOCAL_IP, metrics_port))
+        loop.run_until_complete(room_manager.create_server(LOCAL_IP, port))
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+class Worker:
+    """A worker process and its last load report"""
+
+    def __init__(self, index):
+        self.index = index
+        self.port = WORKER_PORT + index
+        self.metrics_port = METRICS_PORT + 1 + index
+        self.process = None
+        # Supervisor end of the load reports pipe
+        self.conn = None
+        self.load = {}
+        self.started = None
+        self.restarts = 0
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def get_state(self):
+        return {
+            "pid": self.process.pid if self.process is not None else None,
+            "alive": self.is_alive(),
+            "port": self.port,
+            "metrics_port": self.metrics_port,
+            "uptime": time.monotonic() - self.started if self.started is not None else 0,
+            "restarts": self.restarts,
+            **self.load,
+        }
+
+
+class Supervisor:
+    """Start, watch and route connections to the worker processes"""
+
+    def __init__(self, nb_workers, debug=False):
+        """
+        Args:
+            nb_workers (int): worker processes
+            debug (bool): workers log to the console
+        """
+        self.debug = debug
+        self.workers = [Worker(index) for index in range(nb_workers)]
+        # Spawned workers do not inherit the supervisor loop and sockets
+        self.context = multiprocessing.get_context("spawn")
+
+    def start_worker(self, worker):
+        conn, worker_conn = self.context.Pipe(duplex=False)
+        worker.process = self.context.Process(
+            target=run_worker, args=(worker.index, worker.port, worker.metrics_port, worker_conn, self.debug),
+            name=f"bomberman-worker-{worker.index}", daemon=True)
+        worker.process.start()
+        worker_conn.close()
+        worker.conn = conn
+        worker.load = {}
+        worker.started = time.monotonic()
+        asyncio.get_event_loop().add_reader(conn.fileno(), self.receive_load, worker)
+
+    def receive_load(self, worker):
+        try:
+            worker.load = worker.conn.recv()
+        except (EOFError, OSError):
+            # Worker gone, the watcher restarts it
+            self.close_conn(worker)
+
+    @staticmethod
+    def close_conn(worker):
+        if worker.conn is not None:
+            asyncio.get_event_loop().remove_reader(worker.conn.fileno())
+            worker.conn.close()
+            worker.conn = None
+
+    async def watch(self):
+        """Restart the workers which exited"""
+        while True:
+            await asyncio.sleep(LOAD_INTERVAL)
+            for worker in self.workers:
+                if not worker.is_alive():
+                    logging.error(f"Worker {worker.index} exited ({worker.process.exitcode}), restarting")
+                    self.close_conn(worker)
+                    await asyncio.sleep(RESTART_DELAY)
+                    worker.restarts += 1
+                    self.start_worker(worker)
+
+    def get_worker(self, path):
+        """Get the worker hosting the room requested by path
+
+        Public players join the fullest public room with a free slot of all
+        workers, so they meet. The slots are counted down until the next
+        load report, the players connecting meanwhile join the same room.
+        """
+        name = RoomManager.get_room_name(path)
+        if name is not None:
+            return self.workers[zlib.crc32(name.encode()) % len(self.workers)]
+        alive = [worker for worker in self.workers if worker.is_alive()] or self.workers
+        waiting = [worker for worker in alive if worker.load.get("public_slots", 0) > 0]
+        if waiting:
+            worker = min(waiting, key=lambda worker: (worker.load["public_slots"], worker.index))
+            worker.load["public_slots"] -= 1
+        else:
+            worker = min(alive, key=lambda worker: (worker.load.get("users", 0), worker.index))
+            # A new public room
+            worker.load["public_slots"] = InitValues.MAX_USERS - 1
+        return worker
+
+    @staticmethod
+    async def pipe(reader, writer):
+        try:
+            while True:
+                data = await reader.read(PIPE_BUFFER)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, reader, writer):
+        """Forward a client connection to the worker of its room, upgrade request included"""
+        try:
+            header = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), HEADER_TIMEOUT)
+            path = header.split(b"\r\n", 1)[0].split(b" ")[1].decode("ascii")
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, IndexError,
+                UnicodeDecodeError):
+            logging.error(f"Bad upgrade request from {writer.get_extra_info('peername')}")
+            writer.close()
+            return
+
+        worker = self.get_worker(path)
+        try:
+            worker_reader, worker_writer = await asyncio.open_connection(LOCAL_IP, worker.port)
+        except OSError:
+            logging.error(f"Worker {worker.index} unavailable")
+            writer.close()
+            return
+        worker_writer.write(header)
+        await asyncio.gather(self.pipe(reader, worker_writer), self.pipe(worker_reader, writer))
+
+    def get_state(self):
+        return {worker.index: worker.get_state() for worker in self.workers}
+
+    async def control(self, reader, writer):
+        """Control socket client: send the workers state"""
+        writer.write(json.dumps(self.get_state()).encode() + b"\n")
+        await writer.drain()
+        writer.close()
+
+    async def run(self, ip, port, control_path):
+        for worker in self.workers:
+            self.start_worker(worker)
+        if os.path.exists(control_path):
+            os.unlink(control_path)
+        await asyncio.start_unix_server(self.control, control_path)
+        await asyncio.start_server(self.route, ip, port, limit=MAX_HEADER)
+        logging.info(f"Supervisor start, {len(self.workers)} workers")
+        await self.watch()
+
+    def stop(self):
+        for worker in self.workers:
+            if worker.process is not None:
+                worker.process.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-d", action="store_true", help="log to the console")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--control", default=CONTROL_PATH, help="control unix socket path")
+    args = parser.parse_args()
+
+    if args.d:
+        dev_logger()
+    else:
+        logger()
+
+    supervisor = Supervisor(args.workers, args.d)
+    loop = asyncio.get_event_loop()
+    try:
+        loop.run_until_complete(supervisor.run(IP, PORT, args.control))
+    except KeyboardInterrupt:
+        logging.warning("Caught keyboard interrupt. Stopping Server...")
+    finally:
+        supervisor.stop()
+
+
+if __name__ == "__main__":
+    main()
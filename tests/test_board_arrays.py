@@ -0,0 +1,61 @@
+import pytest
+
+from bomb import Bomb
+from game_board import GameBoard
+from user import User
+
+pytest.importorskip("numpy")
+
+SIZES = [10, 64, 256]
+SEEDS = range(5)
+
+
+def make_board(size, seed, arrays):
+    """Seeded board with walls, users and bombs, some bombs under users"""
+    board = GameBoard(size, size, size * size // 5, seed=seed, arrays=arrays)
+    if arrays:
+        assert board.arrays is not None
+    for index, position in enumerate(board.random_spawn(max(2, size * size // 50))):
+        board.spawn(User(None, position, board.mailbox, 0, f"user-{index}"), board.users)
+    users = sorted(board.users, key=lambda user: user.id)
+    positions = [user.get_position() for user in users[:5]]
+    positions += [position for position in board.random_spawn(20) if board.grid.is_free(position)]
+    bombs = []
+    for seq, position in enumerate(dict.fromkeys(positions), 1):
+        bomb = Bomb(position, board.mailbox, users[seq % len(users)], seq)
+        board.spawn(bomb, board.bombs)
+        bombs.append(bomb)
+    return board, bombs
+
+
+def get_result(board):
+    """Explosions and blasted entities of a board, comparable across boards"""
+    explosions = sorted((explosion.get_pos_tuple(), explosion.direction, explosion.user.id)
+                        for explosion in board.explosions)
+    blasted = sorted((entity.get_name(), entity.get_pos_tuple()) for entity in board.blasted)
+    return explosions, blasted
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("seed", SEEDS)
+def test_blasts_equal_object_model(size, seed):
+    board, bombs = make_board(size, seed, arrays=True)
+    assert board.get_blasts(bombs) == [board.get_blast(bomb) for bomb in bombs]
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("seed", SEEDS)
+def test_detonate_equals_object_model(size, seed):
+    """Same seed, same explosions, chain reactions and kills with and without the arrays"""
+    results = []
+    for arrays in (False, True):
+        board, bombs = make_board(size, seed, arrays)
+        board.detonate(bombs)
+        # Users walking into the explosions
+        for user, explosion in zip(sorted(board.users, key=lambda user: user.id),
+                                   sorted(board.explosions, key=lambda explosion: explosion.get_pos_tuple())):
+            user.set_position(explosion.get_position())
+        hits = sorted((user.id, explosion.get_pos_tuple()) for user, explosion in board.get_users_in_explosions())
+        results.append((get_result(board), hits))
+    assert results[0] == results[1]
+    assert results[0][0][0]
@@ -0,0 +1,130 @@
+import json
+import random
+
+import pytest
+
+from constants import EntitiesNames, MapTypes, Messages, Moves
+from danger_map import SAFE
+from game_board import GameBoard
+from timers import to_ticks
+from user import User
+
+
+def add_user(board, name):
+    user = User(None, board.random_spawn()[0], board.mailbox, board.get_next_mod(), name)
+    board.register(user)
+    return user
+
+
+def play(board, users, ticks, seed=0):
+    """Random moves and bombs of users, yields after each tick"""
+    rng = random.Random(seed)
+    for _ in range(ticks):
+        for user in users:
+            draw = rng.random()
+            if draw < 0.3:
+                board.mailbox.send_to_list(EntitiesNames.BOARD, Messages.MOVE, [user, rng.choice(sorted(Moves.ALL))])
+            elif draw < 0.33:
+                board.mailbox.send_to_list(EntitiesNames.BOARD, Messages.BOMB, user)
+        board.tick()
+        yield
+
+
+@pytest.mark.parametrize("map_type, size", [(MapTypes.RANDOM, 10), (MapTypes.CLASSIC, 40), (MapTypes.CAVE, 40)])
+def test_dirty_cells_map_equals_full_map(map_type, size):
+    """The game map built from the dirty cells only is the full board map, dead entities included"""
+    board = GameBoard(size, size, 20, seed=3, map_type=map_type)
+    users = [add_user(board, "user-0"), add_user(board, "user-1")]
+    board.add_bot()
+    create_message = board.create_message
+    mismatches = []
+
+    def checked_create_message():
+        message = create_message()
+        # Before clean_entities removes the dead entities
+        if board.game_map != board.create_map():
+            mismatches.append(board.timers.now)
+        return message
+
+    board.create_message = checked_create_message
+    for _ in play(board, users, 1500):
+        pass
+    assert board.metrics.ticks == 1500
+    assert not mismatches
+
+
+def get_init_cells(board, user):
+    init = json.loads(board.get_init_state(user))
+    return sorted((name, json.dumps(state, sort_keys=True)) for name, states in init.items()
+                  if isinstance(states, list) for state in states)
+
+
+def get_board_cells(board, view):
+    return sorted((name, json.dumps(state, sort_keys=True)) for position, cell in board.create_map().items()
+                  if view is None or position.chunk in view
+                  for name, states in board._create_cell_message(position, cell).items() for state in states)
+
+
+@pytest.mark.parametrize("map_type, size", [(MapTypes.RANDOM, 10), (MapTypes.ROOMS, 100)])
+def test_init_holds_the_world(map_type, size):
+    """Joiners of a fresh room, and of a room back from sleep, get every entity in view"""
+    board = GameBoard(size, size, 20, seed=2, map_type=map_type)
+    user = add_user(board, "user-0")
+    assert board.walls and board.bots
+    assert get_init_cells(board, user) == get_board_cells(board, board.interest.views[user])
+    # Sleep mode, new walls
+    board.unregister(user)
+    user = add_user(board, "user-1")
+    assert get_init_cells(board, user) == get_board_cells(board, board.interest.views[user])
+
+
+def rebuild_hits(board):
+    """Hit tick of every cell in danger, computed from scratch out of the entities states"""
+    danger = board.danger
+    lit = {}
+    for position, cell in board.grid.cells.items():
+        for entity in cell:
+            if entity.get_name() == EntitiesNames.BOMB or entity.EXPLODING:
+                # Tick the first state started
+                lit[entity] = entity.state_end - (entity.state_index + 1) * to_ticks(entity.STATE_INTERVAL)
+    explosions = {entity: tick for entity, tick in lit.items() if entity.EXPLODING}
+    bombs = {entity: tick + danger.fuse for entity, tick in lit.items() if not entity.EXPLODING}
+    rays = {bomb: danger.get_ray(bomb.get_position())[0] for bomb in bombs}
+    # Chain reactions, down to a fixpoint
+    changed = True
+    while changed:
+        changed = False
+        for bomb, ray in rays.items():
+            for index in ray:
+                for other in board.grid.get_bombs(board.positions.at(index)):
+                    if bombs[other] > bombs[bomb]:
+                        bombs[other] = bombs[bomb]
+                        changed = True
+    hits = {}
+    for explosion, tick in explosions.items():
+        index = explosion.get_position().x * board.width + explosion.get_position().y
+        hits[index] = min(hits.get(index, SAFE), tick)
+    for bomb, ray in rays.items():
+        for index in ray:
+            hits[index] = min(hits.get(index, SAFE), bombs[bomb])
+    return hits
+
+
+@pytest.mark.parametrize("map_type, size", [(MapTypes.RANDOM, 10), (MapTypes.CLASSIC, 20), (MapTypes.CAVE, 20)])
+def test_danger_hits_equal_full_rebuild(map_type, size):
+    """The incrementally updated hit ticks match a rebuild, through chains, broken and new walls"""
+    board = GameBoard(size, size, 20, seed=5, map_type=map_type, bot_bombs=True)
+    users = [add_user(board, f"user-{index}") for index in range(3)]
+    for _ in range(3):
+        board.add_bot()
+    mismatches = []
+    for tick, _ in enumerate(play(board, users, 1500, seed=1)):
+        if tick % 100 == 99:
+            # Sleep mode, new walls around the live bombs
+            for user in users:
+                board.unregister(user)
+            users[:] = [add_user(board, user.id) for user in users]
+        if board.danger.hits != rebuild_hits(board):
+            mismatches.append(board.timers.now)
+    assert board.metrics.ticks == 1500
+    assert not mismatches
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import pytest
+import websockets
+
+import inbound
+from constants import EntitiesNames, Moves
+from inbound import InputQueue
+from mailbox import MailBox
+from room_manager import RoomManager
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(inbound, "time", clock)
+    return clock
+
+
+def test_frame_size_limit(clock):
+    inputs = InputQueue()
+    assert inputs.accept("x" * InputQueue.MAX_FRAME)
+    assert not inputs.accept("x" * (InputQueue.MAX_FRAME + 1))
+    assert inputs.accept(b"x" * 16)
+    assert (inputs.rejected, inputs.dropped) == (1, 0)
+
+
+def test_frame_rate_limit(clock):
+    inputs = InputQueue(rate=10, burst=5)
+    assert all(inputs.accept("{}") for _ in range(5))
+    assert not inputs.accept("{}")
+    # One frame per 1 / rate seconds
+    clock.now += 0.15
+    assert inputs.accept("{}")
+    assert not inputs.accept("{}")
+    # The bucket never holds more than burst frames
+    clock.now += 60
+    assert sum(inputs.accept("{}") for _ in range(10)) == 5
+    assert inputs.dropped == 7
+
+
+def test_inputs_coalesced(clock):
+    inputs = InputQueue()
+    mailbox = MailBox()
+    user = object()
+    assert inputs.put_move(Moves.UP)
+    assert not inputs.put_move(Moves.LEFT)
+    assert not inputs.put_bomb()
+    assert not inputs.put_bomb()
+    inputs.flush(user, mailbox)
+    mailbox.drop()
+    mail = mailbox.get(EntitiesNames.BOARD)
+    assert mail.move == [[user, Moves.LEFT]]
+    assert mail.bomb == [user]
+    assert (inputs.move, inputs.bomb, inputs.pending) == (None, False, False)
+
+
+def test_server_frame_limit():
+    """The room server closes a connection sending a frame over MAX_FRAME, before InputQueue sees it"""
+
+    async def run():
+        room_manager = RoomManager()
+        server = await room_manager.create_server("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            async with websockets.connect(f"ws://127.0.0.1:{port}/frames") as ws:
+                init = json.loads(await ws.recv())
+                assert init["type"] == "init"
+                await ws.send(json.dumps({"action": Moves.UP}))
+                await ws.send(json.dumps({"chat": "x" * 5000}))
+                with pytest.raises(websockets.exceptions.ConnectionClosed) as closed:
+                    while True:
+                        await ws.recv()
+                # Message too big
+                assert closed.value.rcvd.code == 1009
+        finally:
+            server.close()
+            await server.wait_closed()
+            room_manager.bot_executor.shutdown()
+
+    asyncio.run(asyncio.wait_for(run(), 10))
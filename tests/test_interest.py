@@ -0,0 +1,98 @@
+import json
+import random
+
+from constants import EntitiesNames, MapTypes, Messages, Moves, Protocols
+from game_board import GameBoard
+from outbound import OutboundQueue
+from user import User
+
+
+class Socket:
+    """Websocket stand-in, the outbound queues are drained by the test"""
+
+    remote_address = ("test", 0)
+
+
+class Client:
+    """Picture of the board of a web client, built from the messages it receives"""
+
+    def __init__(self):
+        # {(x, y): sorted [(entity name, state)]}
+        self.cells = {}
+
+    def receive(self, message):
+        message = json.loads(message)
+        if message["type"] not in ("init", "map"):
+            return
+        cells = {}
+        for name, states in message.items():
+            if isinstance(states, list):
+                for state in states:
+                    cells.setdefault((state["x"], state["y"]), []).append((name, json.dumps(state, sort_keys=True)))
+        for position, states in cells.items():
+            states = sorted(state for state in states if state[0] != EntitiesNames.ENTITY)
+            if states:
+                self.cells[position] = states
+            else:
+                # Grass
+                self.cells.pop(position, None)
+
+
+def get_picture(board, view):
+    """Cells of the last notified game map in view, as a client shows them"""
+    cells = {}
+    for position, cell in board.game_map.items():
+        if view is None or position.chunk in view:
+            for name, states in board._create_cell_message(position, cell).items():
+                cells.setdefault((position.x, position.y), []).extend(
+                    (name, json.dumps(state, sort_keys=True)) for state in states)
+    return {position: sorted(states) for position, states in cells.items()}
+
+
+def test_collapsed_deltas_and_view_moves():
+    """Clients whose deltas are collapsed keep the server picture of their view across view moves"""
+    board = GameBoard(128, 128, 0, seed=5, map_type=MapTypes.ROOMS)
+    rng = random.Random(1)
+    users, clients = [], {}
+    for index in range(3):
+        user = User(Socket(), board.random_spawn()[0], board.mailbox, board.get_next_mod(), f"user-{index}")
+        user.protocol = Protocols.JSON
+        board.spawn(user, board.users)
+        board.interest.views[user] = board.interest.get_view(user.get_position())
+        # Never started, drained below
+        user.outbound = OutboundQueue(user.ws, lambda user=user: board.get_view_snapshot(user))
+        user.outbound.put(board.get_init_state(user))
+        users.append(user)
+        clients[user] = Client()
+    for _ in range(4):
+        board.add_bot()
+
+    view_moves = 0
+    for tick in range(1500):
+        for user in users:
+            if rng.random() < 0.5:
+                board.mailbox.send_to_list(EntitiesNames.BOARD, Messages.MOVE, [user, rng.choice(sorted(Moves.ALL))])
+            if rng.random() < 0.02:
+                board.mailbox.send_to_list(EntitiesNames.BOARD, Messages.BOMB, user)
+        views = dict(board.interest.views)
+        board.tick()
+        moved = {user for user in users if board.interest.views[user] is not views[user]}
+        view_moves += len(moved)
+        # Slow clients: 10 ticks of deltas held every 37 ticks, then collapsed
+        if tick % 37 < 9:
+            continue
+        pictures = {}
+        for user in users:
+            if tick % 37 == 9:
+                user.outbound.collapse()
+            while user.outbound.queue:
+                clients[user].receive(user.outbound.queue.popleft()[1])
+            # After a collapse, and when the stale cells of a chunk back in view would show
+            if tick % 37 == 9 or user in moved:
+                view = board.interest.views[user]
+                if view not in pictures:
+                    pictures[view] = get_picture(board, view)
+                # Cells out of view are grass
+                assert clients[user].cells == pictures[view], (tick, user.id)
+    assert view_moves > 20
+    assert all(user.outbound.collapses for user in users)
@@ -0,0 +1,64 @@
+import logging
+
+from constants import EntitiesNames, Messages, Moves
+from entity import Entity
+from mailbox import MailBox, NO_MESSAGE
+from position import PositionTable
+
+POSITIONS = PositionTable(10, 10)
+
+
+def test_drop_delivers_next_tick():
+    mailbox = MailBox()
+    entity = Entity(POSITIONS.get(1, 2), mailbox)
+    mailbox.send(entity, Messages.BLOCKED, True)
+    assert entity.message_queue is None
+    mailbox.drop()
+    assert mailbox.delivered == [entity]
+    assert entity.message_queue.blocked is True
+    entity.update()
+    assert entity.blocked and entity.message_queue is None
+    mailbox.drop()
+    assert mailbox.delivered == []
+
+
+def test_drop_key_delivers_board_mail_now():
+    """Board mail of the tick is taken the same tick, with the mail left since the last drop"""
+    mailbox = MailBox()
+    mailbox.send_to_list(EntitiesNames.BOARD, Messages.MOVE, ["user", Moves.UP])
+    mailbox.drop()
+    mailbox.send_to_list(EntitiesNames.BOARD, Messages.MOVE, ["user", Moves.LEFT])
+    mailbox.drop_key(EntitiesNames.BOARD)
+    mail = mailbox.get(EntitiesNames.BOARD)
+    assert mail.move == [["user", Moves.UP], ["user", Moves.LEFT]]
+    mail.move.clear()
+    assert mailbox.get(EntitiesNames.BOARD) is None
+    mailbox.drop()
+    assert mailbox.get(EntitiesNames.BOARD) is None
+
+
+def test_unhandled_mail_logged_and_dropped(caplog):
+    mailbox = MailBox()
+    entity = Entity(POSITIONS.get(1, 2), mailbox)
+    mailbox.send(entity, Messages.POSITION, "somewhere")
+    mailbox.send_to_list(EntitiesNames.LOG, Messages.LOGS, (1, "hello"))
+    mailbox.drop()
+    # Neither the entity nor the log mail is handled
+    with caplog.at_level(logging.ERROR):
+        mailbox.drop()
+    assert "Outbox should be empty" in caplog.text
+    assert "somewhere" in caplog.text and "hello" in caplog.text
+    assert entity.message_queue is None
+    assert entity.mail_slot[0].position is NO_MESSAGE and entity.mail_slot[1].position is NO_MESSAGE
+    assert mailbox.get(EntitiesNames.LOG) is None
+
+
+def test_handled_mail_not_logged(caplog):
+    mailbox = MailBox()
+    entity = Entity(POSITIONS.get(1, 2), mailbox)
+    mailbox.send(entity, Messages.BLOCKED, True)
+    mailbox.drop()
+    entity.update()
+    with caplog.at_level(logging.ERROR):
+        mailbox.drop()
+    assert not caplog.text
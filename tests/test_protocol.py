@@ -0,0 +1,63 @@
+import json
+
+from constants import Directions, EntitiesNames, MapTypes, Protocols
+from game_board import GameBoard
+from protocol import decode_map, encode, encode_map
+from test_game_board import add_user, play
+
+
+def get_encoded_fields(message):
+    """Map message states restricted to the fields of the binary records"""
+    decoded = decode_map(encode_map(message))
+    return {name: [{key: state[key] for key in decoded_states[0]} for state in message[name]]
+            for name, decoded_states in decoded.items() if name != "type"}
+
+
+def test_round_trip_every_kind():
+    message = {
+        "type": "map",
+        EntitiesNames.ENTITY: [{"x": 3, "y": 4, "dead": False}],
+        EntitiesNames.USER: [{"x": 1, "y": 2, "dead": False, "can_drop": True, "mod": 3, "id": "user", "uid": 70000,
+                              "deaths": 5, "killed": 6, "suicides": 7}],
+        EntitiesNames.WALL: [{"x": 0, "y": 0, "dead": False, "wall_state": None},
+                             {"x": 9, "y": 9, "dead": True, "wall_state": 2}],
+        EntitiesNames.BOMB: [{"x": 5, "y": 6, "dead": False, "bomb_state": 1}],
+        EntitiesNames.EXPLOSION: [{"x": 7, "y": 8, "dead": True, "explosion_state": 0,
+                                   "direction": direction} for direction in (Directions.ALL, Directions.VERTICAL,
+                                                                              Directions.HORIZONTAL)],
+    }
+    decoded = decode_map(encode_map(message))
+    user = dict(message[EntitiesNames.USER][0])
+    # The user id string is JSON only
+    del user["id"]
+    assert decoded == {**message, EntitiesNames.USER: [user]}
+
+
+def test_uid_over_uint16():
+    """Uids only count up, a long-lived room goes over 65535"""
+    board = GameBoard(seed=0)
+    board._uids = 2 ** 16
+    user = add_user(board, "user-0")
+    message = {"type": "map", EntitiesNames.USER: [user.get_state()]}
+    assert decode_map(encode(message, Protocols.BINARY))[EntitiesNames.USER][0]["uid"] == 2 ** 16 + 1
+
+
+def test_round_trip_game_messages():
+    """Binary map deltas and snapshots of a game decode to their JSON form"""
+    board = GameBoard(40, 40, 20, seed=1, map_type=MapTypes.CAVE)
+    users = [add_user(board, "user-0"), add_user(board, "user-1")]
+    board.add_bot()
+    messages = []
+    create_message = board.create_message
+    board.create_message = lambda: messages.append(create_message()) or messages[-1]
+    for _ in play(board, users, 500):
+        pass
+    kinds = set()
+    for message in filter(None, messages):
+        kinds.update(message)
+        assert decode_map(encode(message, Protocols.BINARY)) == {"type": "map", **get_encoded_fields(message)}
+    snapshot = json.loads(board.get_snapshot_message(Protocols.JSON))
+    assert decode_map(board.get_snapshot_message(Protocols.BINARY)) == {"type": "map", **get_encoded_fields(snapshot)}
+    # Every kind went through
+    assert kinds >= {EntitiesNames.ENTITY, EntitiesNames.USER, EntitiesNames.WALL, EntitiesNames.BOMB,
+                     EntitiesNames.EXPLOSION}
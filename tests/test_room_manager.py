@@ -0,0 +1,71 @@
+import pytest
+
+from constants import InitValues
+from room_manager import RoomManager
+
+
+class Player:
+    """Socketless user"""
+
+    ws = None
+
+
+@pytest.fixture
+def room_manager():
+    room_manager = RoomManager()
+    yield room_manager
+    room_manager.bot_executor.shutdown()
+
+
+def fill(room):
+    room.users.update(object() for _ in range(InitValues.MAX_USERS - len(room.users)))
+
+
+@pytest.mark.parametrize("path, name", [
+    ("/", None),
+    ("/my_room", "my_room"),
+    ("/?room=my_room", "my_room"),
+    ("/bad.name", None),
+    ("/publication", "publication"),
+    ("/public", "public"),
+    # Generated public room names
+    ("/public-1", None),
+    ("/?room=public-2", None),
+])
+def test_room_name(path, name):
+    assert RoomManager.get_room_name(path) == name
+
+
+def test_public_matchmaking(room_manager):
+    private_name, private = room_manager.get_room("publication")
+    name, room = room_manager.get_room(None)
+    assert name == "public-1" and room is not private
+    # Players wait in the public room until it is full
+    assert room_manager.get_room(None) == (name, room)
+    fill(room)
+    next_name, next_room = room_manager.get_room(None)
+    assert next_name == "public-2" and not next_room.is_full()
+    # A client cannot join a public room by name
+    assert room_manager.get_room(room_manager.get_room_name("/public-3"))[0] == "public-2"
+    room_manager.close_room(next_name)
+    assert room_manager.get_room(None)[0] == "public-3"
+    assert set(room_manager.public_rooms) == {"public-1", "public-3"}
+
+
+def test_failing_room_closed(room_manager, caplog):
+    """A room whose tick raises is closed, the other rooms keep ticking"""
+    _, broken = room_manager.get_room("broken")
+    _, room = room_manager.get_room("room")
+    for board in (broken, room):
+        board.users.add(Player())
+
+    def tick():
+        raise RuntimeError("room bug")
+
+    broken.tick = tick
+    room.tick = lambda: setattr(room, "ticked", getattr(room, "ticked", 0) + 1)
+    room_manager.tick()
+    room_manager.tick()
+    assert "broken" not in room_manager.rooms and "broken" not in room_manager.stats
+    assert room.ticked == 2
+    assert "Room broken tick failed" in caplog.text
@@ -0,0 +1,52 @@
+from scheduler import TickScheduler
+
+PERIOD = 0.25
+
+
+class Clock:
+    def __init__(self):
+        self.now = 10.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler(max_catch_up=5):
+    clock = Clock()
+    ticks = []
+    scheduler = TickScheduler(lambda: ticks.append(clock.now), PERIOD, max_catch_up, clock=clock)
+    scheduler.deadline = clock.now + PERIOD
+    return scheduler, clock, ticks
+
+
+def test_on_time_tick():
+    scheduler, clock, ticks = make_scheduler()
+    clock.now = scheduler.deadline
+    assert scheduler.run_due() == 1
+    assert scheduler.deadline == clock.now + PERIOD
+    assert scheduler.get_state() == {"ticks": 1, "late_ticks": 0, "skipped_ticks": 0}
+
+
+def test_catch_up():
+    """Missed ticks run back to back, the deadlines stay on the fixed grid"""
+    scheduler, clock, ticks = make_scheduler()
+    start = scheduler.deadline
+    clock.now = start + 3.5 * PERIOD
+    assert scheduler.run_due() == 4
+    assert len(ticks) == 4
+    assert scheduler.deadline == start + 4 * PERIOD
+    assert scheduler.get_state() == {"ticks": 4, "late_ticks": 3, "skipped_ticks": 0}
+
+
+def test_catch_up_capped():
+    """Past max_catch_up late ticks, the others are skipped"""
+    scheduler, clock, ticks = make_scheduler(max_catch_up=5)
+    start = scheduler.deadline
+    clock.now = start + 10 * PERIOD
+    assert scheduler.run_due() == 6
+    assert scheduler.get_state() == {"ticks": 6, "late_ticks": 5, "skipped_ticks": 5}
+    # Next deadline after now, no burst on the next call
+    assert scheduler.deadline == start + 11 * PERIOD
+    clock.now = scheduler.deadline
+    assert scheduler.run_due() == 1
+    assert scheduler.get_state() == {"ticks": 7, "late_ticks": 5, "skipped_ticks": 5}
@@ -0,0 +1,47 @@
+from constants import InitValues
+from supervisor import Supervisor
+
+
+class Process:
+    pid = 0
+
+    @staticmethod
+    def is_alive():
+        return True
+
+
+def make_supervisor(loads):
+    supervisor = Supervisor(len(loads))
+    for worker, load in zip(supervisor.workers, loads):
+        worker.process = Process()
+        worker.load = load
+    return supervisor
+
+
+def test_public_players_meet():
+    """A public player joins the worker where a public player waits, not the least loaded one"""
+    supervisor = make_supervisor([{"users": 1, "public_slots": InitValues.MAX_USERS - 1}, {"users": 0},
+                                  {"users": 0}, {"users": 0}])
+    assert [supervisor.get_worker("/").index for _ in range(InitValues.MAX_USERS - 1)] == [0, 0, 0]
+    # Room full, a new public room on the least loaded worker
+    assert supervisor.get_worker("/").index == 1
+
+
+def test_fresh_public_players_meet():
+    """Without reports in between, the first public players of a fresh supervisor share a room"""
+    supervisor = make_supervisor([{}, {}, {}, {}])
+    workers = [supervisor.get_worker("/").index for _ in range(InitValues.MAX_USERS)]
+    assert workers == [0] * InitValues.MAX_USERS
+
+
+def test_fullest_public_room_first():
+    supervisor = make_supervisor([{"users": 1, "public_slots": 3}, {"users": 6, "public_slots": 1}])
+    assert supervisor.get_worker("/").index == 1
+    assert supervisor.get_worker("/").index == 0
+
+
+def test_named_rooms_stay_on_their_worker():
+    supervisor = make_supervisor([{"public_slots": 3}, {}, {}, {}])
+    assert len({supervisor.get_worker("/my_room").index for _ in range(5)}) == 1
+    # Reserved public names are matchmaking
+    assert supervisor.get_worker("/public-1").index == 0
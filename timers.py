@@ -0,0 +1,54 @@
+from heapq import heappush, heappop
+
+from constants import InitValues
+
+
+def to_ticks(seconds):
+    """Duration in whole ticks, at least one"""
+    return max(1, round(seconds / InitValues.TICKS))
+
+
+class Timers:
+    """Board timers, a min-heap of callbacks keyed by tick number
+
+    Only the callbacks due at the current tick are run, entities with
+    nothing expiring are not visited. Timers are never cancelled: a
+    callback whose entity was despawned is dropped, a callback made stale
+    by a later reschedule checks it by itself.
+    """
+
+    def __init__(self):
+        # Current tick number
+        self.now = 0
+        # [(tick, insertion counter, entity, callback)], the counter keeps ties FIFO
+        self._heap = []
+        self._counter = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def advance(self):
+        """Start the next tick"""
+        self.now += 1
+
+    def add(self, delay, entity, callback):
+        """Call callback() in delay ticks (next tick when delay is 0)
+
+        Args:
+            delay (int): ticks from now
+            entity (Entity): entity owning the timer
+            callback (function): no argument
+        """
+        self._counter += 1
+        heappush(self._heap, (self.now + delay, self._counter, entity, callback))
+
+    def pop_due(self):
+        """Get the timers due at the current tick, in expiry order
+
+        Yields:
+            (Entity, function): entity and callback
+        """
+        heap = self._heap
+        while heap and heap[0][0] <= self.now:
+            _, _, entity, callback = heappop(heap)
+            yield entity, callback
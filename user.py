@@ -1,23 +1,38 @@
-from constants import EntitiesNames, InitValues, Messages
+from constants import EntitiesNames, Messages, Protocols
 from entity import Entity
+from mailbox import NO_MESSAGE
+from timers import to_ticks
 
 
 class User(Entity):
+    # Seconds
     BOMB_CD = 1
     STATE_INTERVAL = 0.5
     DESTRUCTIBLE = True
     BLOCKABLE = True
+    MOBILE = True
+
+    __slots__ = ("ws", "mod", "id", "uid", "protocol", "bomb_cd_end", "nb_kill", "nb_suicide", "nb_death", "bomb_dropped",
+                 "outbound", "inputs")
 
     def __init__(self, ws, position, mailbox, mod, user_id):
         super().__init__(position, mailbox)
         self.ws = ws
         self.mod = mod
         self.id = user_id
-        self.bomb_cd = 0
+        # Small board id, binary protocol user key
+        self.uid = 0
+        self.protocol = Protocols.JSON
+        # Tick the bomb cooldown ends
+        self.bomb_cd_end = 0
         self.nb_kill = 0
         self.nb_suicide = 0
         self.nb_death = 0
         self.bomb_dropped = False
+        # Outbound messages queue, websocket users only
+        self.outbound = None
+        # Coalesced socket inputs, websocket users only
+        self.inputs = None
 
     def __str__(self):
         ws = self.ws.remote_address[0] if self.ws is not None else 'bot'
@@ -28,38 +43,48 @@ class User(Entity):
 
     def message_handle(self):
         Entity.message_handle(self)
-        message = {}
-
-        if Messages.BOMB_DROPPED in self.message_queue:
-            self.bomb_dropped = self.message_queue.pop(Messages.BOMB_DROPPED)
-            if self.bomb_dropped:
-                self.bomb_cd = self.BOMB_CD
+        mail = self.message_queue
 
-        # TODO cd handle -> entity
-        if self.bomb_cd < 0:
-            self.bomb_dropped = False
-        else:
-            self.bomb_cd -= InitValues.TICKS
+        if mail is not None and mail.bomb_dropped is not NO_MESSAGE:
+            self.bomb_dropped = mail.bomb_dropped
+            mail.bomb_dropped = NO_MESSAGE
+            if self.bomb_dropped and self.timers is not None:
+                delay = to_ticks(self.BOMB_CD)
+                self.bomb_cd_end = self.timers.now + delay
+                self.timers.add(delay, self, self.end_bomb_cd)
+            self.mark_dirty()
 
-        if Messages.RESET in self.message_queue:
-            self._position = self.message_queue.pop(Messages.RESET)
+        if mail is not None and mail.reset is not NO_MESSAGE:
+            self._position = mail.reset
+            mail.reset = NO_MESSAGE
+            if self.grid is not None:
+                self.grid.move(self)
             self.killed = None
             self.blocked = False
-            message.update({Messages.BOMB_DROPPED: True})
+            self.mailbox.send(self, Messages.BOMB_DROPPED, True)
             self._dead = False
+            self.mark_dirty()
 
-        if message:
-            self.mailbox.send(self, message)
+    def end_bomb_cd(self):
+        """Timer callback, the user can drop a bomb again"""
+        if self.timers.now < self.bomb_cd_end or not self.bomb_dropped:
+            # Cooldown restarted or already over
+            return
+        self.bomb_dropped = False
+        self.mark_dirty()
 
     def killed_message_handle(self):
-        if Messages.KILLED in self.message_queue:
-            self.killed = self.message_queue.pop(Messages.KILLED)
-            self.mailbox.send_to_list(EntitiesNames.LOG, self.mod, f"killed by *{self.killed.mod}*")
+        mail = self.message_queue
+        if mail.killed is not NO_MESSAGE:
+            self.killed = mail.killed
+            mail.killed = NO_MESSAGE
+            self.mailbox.send_to_list(EntitiesNames.LOG, Messages.LOGS, (self.mod, f"killed by *{self.killed.mod}*"))
             self.kill()
             if self.killed is self:
                 self.nb_suicide += 1
             elif isinstance(self.killed, User):
                 self.killed.nb_kill += 1
+                self.killed.mark_dirty()
                 self.nb_death += 1
 
     def is_user_can_drop_bomb(self):
@@ -69,6 +94,7 @@ class User(Entity):
         return {
             "mod": self.mod,
             "id": self.id,
+            "uid": self.uid,
             "can_drop": self.is_user_can_drop_bomb(),
             "deaths": self.nb_death,
             "killed": self.nb_kill,
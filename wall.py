@@ -6,6 +6,8 @@ class Wall(Entity):
     DESTRUCTIBLE = True
     BLOCKABLE = True
 
+    __slots__ = ()
+
     def __init__(self, position, mailbox):
         Entity.__init__(self, position, mailbox)
 
@@ -13,7 +15,10 @@ class Wall(Entity):
         return EntitiesNames.WALL
 
     def next_state(self):
-        self.state = next(self.state_iterator, None)
+        # Past the last state when destroyed
+        self.state_index += 1
+        self.state = self.STATE[self.state_index] if self.state_index < len(self.STATE) else None
+        self.mark_dirty()
 
     def get_state(self):
         return {"wall_state": self.state, **Entity.get_state(self)}
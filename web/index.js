@@ -16,6 +16,70 @@ const USER2 = 'imgs/user2.png';
 const USER3 = 'imgs/user3.png';
 const USER4 = 'imgs/user4.png';
 const MAX_LOG = 20;
+const ROOM = new URLSearchParams(window.location.search).get('room') || '';
+// Websocket subprotocols, binary map messages preferred
+const PROTOCOL_BINARY = 'bomberman.bin';
+const PROTOCOL_JSON = 'bomberman.json';
+const MESSAGE_MAP = 1;
+const DIRECTIONS = ['f', 'v', 'h'];
+
+// Binary records by kind id: entity name and record decoder (after x, y)
+const KINDS = {
+    0: ['entity', 0, (view, offset, entity) => {
+        entity.dead = false;
+    }],
+    1: ['user', 18, (view, offset, entity) => {
+        let flags = view.getUint8(offset);
+        entity.dead = (flags & 1) === 1;
+        entity.can_drop = (flags & 2) === 2;
+        entity.mod = view.getUint8(offset + 1);
+        entity.uid = view.getUint32(offset + 2, true);
+        entity.deaths = view.getUint32(offset + 6, true);
+        entity.killed = view.getUint32(offset + 10, true);
+        entity.suicides = view.getUint32(offset + 14, true);
+    }],
+    2: ['wall', 2, (view, offset, entity) => {
+        entity.dead = (view.getUint8(offset) & 1) === 1;
+        entity.wall_state = view.getInt8(offset + 1);
+    }],
+    3: ['bomb', 2, (view, offset, entity) => {
+        entity.dead = (view.getUint8(offset) & 1) === 1;
+        entity.bomb_state = view.getUint8(offset + 1);
+    }],
+    4: ['explosion', 3, (view, offset, entity) => {
+        entity.dead = (view.getUint8(offset) & 1) === 1;
+        entity.explosion_state = view.getUint8(offset + 1);
+        entity.direction = DIRECTIONS[view.getUint8(offset + 2)];
+    }],
+};
+
+function decodeMap(buffer) {
+    const view = new DataView(buffer);
+    let data = {
+        type: 'map'
+    };
+    if (view.getUint8(0) !== MESSAGE_MAP) return data;
+
+    let kinds = view.getUint8(1);
+    let offset = 2;
+    for (let k = 0; k < kinds; k++) {
+        let [name, size, decode] = KINDS[view.getUint8(offset)];
+        let count = view.getUint32(offset + 1, true);
+        offset += 5;
+        let entities = [];
+        for (let i = 0; i < count; i++) {
+            let entity = {
+                x: view.getUint16(offset, true),
+                y: view.getUint16(offset + 2, true)
+            };
+            decode(view, offset + 4, entity);
+            entities.push(entity);
+            offset += 4 + size;
+        }
+        data[name] = entities;
+    }
+    return data;
+}
 
 class WebSocketClient {
     address;
@@ -33,7 +97,10 @@ class WebSocketClient {
     }
 
     connect() {
-        this.ws = new WebSocket(`ws://${this.address}:${this.port}/`);
+        this.ws = new WebSocket(
+            `ws://${this.address}:${this.port}/${encodeURIComponent(ROOM)}`, [PROTOCOL_BINARY, PROTOCOL_JSON]
+        );
+        this.ws.binaryType = 'arraybuffer';
 
         this.ws.onclose = () => {
             this.onClose();
@@ -57,7 +124,7 @@ class WebSocketClient {
     }
 
     onMessage(e) {
-        const data = JSON.parse(e.data);
+        const data = e.data instanceof ArrayBuffer ? decodeMap(e.data) : JSON.parse(e.data);
         // Todo should add a debug option for logs
         // console.log(data)
 
@@ -67,8 +134,9 @@ class WebSocketClient {
                     !this.id &&
                     this.options.onInit && {}.toString.call(this.options.onInit) === '[object Function]'
                 ) {
-                    this.options.onInit(data);
                     this.id = data.id;
+                    this.uid = data.uid;
+                    this.options.onInit(data);
                 }
                 break;
             case 'map':
@@ -402,7 +470,7 @@ class Game {
         let lines = boardElement.getElementsByClassName('line');
 
         users.forEach((user) => {
-            if (user.id === this.ws.id) {
+            if (user.id === this.ws.id || (user.id === undefined && user.uid === this.ws.uid)) {
                 let game_status = document.getElementById('gamestatus');
                 game_status.innerHTML = '';
                 let img = document.createElement('img');